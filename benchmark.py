@@ -0,0 +1,167 @@
+"""Замеры горячих путей игры без экрана (QT_QPA_PLATFORM=offscreen):
+создание окна и время до первого кадра, запуск игры на каждом размере поля,
+генерация позиции, обработка нажатия вместе с перерисовкой и таблица лидеров
+на базах разного размера.
+
+python benchmark.py [--rows 1000 100000 1000000] [--output results.json]
+python benchmark.py --compare results.json [--threshold 0.25]
+
+С --compare медиана каждого замера сравнивается с прошлым прогоном, и при
+замедлении больше чем на threshold (доля) выход с кодом 1."""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QT_VERSION_STR, Qt
+from PyQt5.QtGui import QColor, QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+SIZES = (2, 3, 4, 5, 8, 10, 16)
+ROWS = (1000, 100000, 1000000)
+# Замедление меньше этого (мс) считается шумом, а не регрессией
+NOISE_MS = 0.05
+
+
+def measure(function, repeat, setup=None):
+    """Время одного вызова function (мс): медиана и минимум по repeat запускам"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - started) * 1000)
+    return {'median_ms': statistics.median(times), 'min_ms': min(times), 'runs': repeat}
+
+
+def run(rows_list, app):
+    from classes.image_loader import read_image
+    from classes.main_window import MainWindow
+    from leaderboard import LeaderboardService, seed
+
+    results = {}
+    windows = []
+
+    def create_window():
+        windows.append(MainWindow())
+
+    def first_frame():
+        # от создания окна до первого кадра с главным меню
+        window = MainWindow()
+        window.show()
+        app.processEvents()
+        windows.append(window)
+
+    def all_screens():
+        # то же плюс постройка всех окон сразу, как было до ленивой постройки
+        first_frame()
+        for screen in windows[-1].builders:
+            if screen not in windows[-1].built:
+                windows[-1].build(screen)
+
+    results['main_window'] = measure(create_window, 5)
+    results['first_frame'] = measure(first_frame, 5)
+    results['all_screens'] = measure(all_screens, 5)
+    for window in windows[1:]:
+        window.close()
+    window = windows[0]
+    window.show()
+    app.processEvents()
+
+    with tempfile.TemporaryDirectory() as directory:
+        picture = os.path.join(directory, 'picture.jpg')
+        image = QImage(2400, 1600, QImage.Format_RGB32)
+        image.fill(QColor('teal'))
+        image.save(picture)
+        results['read_image'] = measure(lambda: read_image(picture), 5)
+        pixmap = QPixmap.fromImage(read_image(picture))
+
+        for n in SIZES:
+            size = f'{n} x {n}'
+            window.difficulty = size
+            window.number_of_bricks = n * n
+
+            def start():
+                window.begin_game(pixmap)
+                app.processEvents()
+
+            results[f'begin_game[{size}]'] = measure(start, 5, setup=window.end_game)
+            results[f'field_generation[{size}]'] = measure(lambda: window.field_generation(1), 20)
+
+            keys = (Qt.Key_Left, Qt.Key_Right, Qt.Key_Up, Qt.Key_Down)
+            pressed = iter(range(10 ** 9))
+
+            def press():
+                # то же, что keyPressEvent, но без диалога победы
+                window.move_check(keys[next(pressed) % len(keys)])
+                window.puzzle.is_solved()
+                app.processEvents()
+
+            results[f'keypress[{size}]'] = measure(press, 200)
+            window.end_game()
+
+        service = window.leaderboard
+        if 'leader_board' not in window.built:
+            window.build('leader_board')
+        window.sort_by_difficulty.setCurrentText('4 x 4')
+        for rows in rows_list:
+            other = LeaderboardService(os.path.join(directory, f'leaderboard{rows}.db'))
+            seed(other.con, rows)
+            window.leaderboard = window.leaders_model.service = other
+            results[f'read_the_database[{rows}]'] = measure(window.read_the_database, 20)
+            results[f'tbl_update[{rows}]'] = measure(window.tbl_update, 20)
+            other.close()
+        window.leaderboard = window.leaders_model.service = service
+    window.close()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Список регрессий: (замер, было мс, стало мс)"""
+    slower = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['median_ms'], result['median_ms']
+        if after > before * (1 + threshold) and after - before > NOISE_MS:
+            slower.append((name, before, after))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры горячих путей игры')
+    parser.add_argument('--rows', type=int, nargs='+', default=list(ROWS),
+                        help='размеры баз для таблицы лидеров')
+    parser.add_argument('--output', help='куда сохранить результаты (JSON)')
+    parser.add_argument('--compare', help='результаты прошлого прогона (JSON)')
+    parser.add_argument('--threshold', type=float, default=0.25)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    results = run(args.rows, app)
+    for name, result in results.items():
+        print(f'{name:<28} {result["median_ms"]:10.3f} мс (мин. {result["min_ms"]:.3f})')
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as file:
+            json.dump({'python': platform.python_version(), 'qt': QT_VERSION_STR,
+                       'platform': platform.platform(), 'created_at': int(time.time()),
+                       'results': results}, file, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding='utf8') as file:
+            baseline = json.load(file)['results']
+        slower = compare(results, baseline, args.threshold)
+        for name, before, after in slower:
+            print(f'РЕГРЕССИЯ {name}: {before:.3f} -> {after:.3f} мс')
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Общий реестр ресурсов: шрифты, иконки и тексты (таблицы стилей, справка)
+загружаются по одному разу, а отрисованные иконки каждого размера хранятся
+в QPixmapCache.
+
+Ресурсы можно собрать в модуль Qt (тогда они читаются из памяти процесса и
+не зависят от текущей папки):
+    pyrcc5 resources.qrc -o resources_rc.py
+Без resources_rc.py всё читается из папок проекта."""
+from functools import lru_cache
+
+from PyQt5.QtCore import QFile, QIODevice, QSize
+from PyQt5.QtGui import QFontDatabase, QIcon, QPixmapCache
+
+try:
+    import resources_rc  # noqa: F401 - при импорте ресурсы регистрируются в Qt
+    BUNDLED = True
+except ImportError:
+    BUNDLED = False
+
+FONT = 'fonts/HoboStd.otf'
+
+
+def resource(name):
+    """Путь к ресурсу: внутри собранного модуля или относительно папки проекта"""
+    return f':/{name}' if BUNDLED else name
+
+
+@lru_cache(maxsize=None)
+def font_family(name=FONT):
+    """Регистрация шрифта (один раз) и имя его семейства для QFont"""
+    families = QFontDatabase.applicationFontFamilies(
+        QFontDatabase.addApplicationFont(resource(name)))
+    return families[0] if families else ''
+
+
+@lru_cache(maxsize=None)
+def icon(name):
+    return QIcon(resource(name))
+
+
+@lru_cache(maxsize=None)
+def text(name):
+    """Содержимое текстового файла (таблица стилей, справка)"""
+    file = QFile(resource(name))
+    if not file.open(QIODevice.ReadOnly | QIODevice.Text):
+        raise FileNotFoundError(name)
+    data = bytes(file.readAll()).decode('utf8')
+    file.close()
+    return data
+
+
+def cached_pixmap(key, draw):
+    """Картинка по ключу key из QPixmapCache; при промахе её рисует draw().
+    Кэш сам вытесняет картинки, когда не хватает места"""
+    found = QPixmapCache.find(key)
+    if found is None:
+        found = draw()
+        QPixmapCache.insert(key, found)
+    return found
+
+
+def pixmap(name, side):
+    """Иконка name, отрисованная в квадрат side x side"""
+    return cached_pixmap(f'{name}@{side}', lambda: icon(name).pixmap(QSize(side, side)))
@@ -0,0 +1,141 @@
+import time
+
+from PyQt5.QtCore import QRect, QTimer
+from PyQt5.QtGui import QPainter
+from PyQt5.QtWidgets import QWidget
+
+from tools import SIZE
+
+# Промежуток между кирпичиками на поле (px)
+GAP = 5
+# Длительность скольжения кирпичика (мс), 0 - кирпичик переносится сразу
+SLIDE_DURATION = 90
+# Все скольжения двигает один таймер с этим шагом (мс)
+FRAME_INTERVAL = 16
+
+
+class Board(QWidget):
+    """Игровое поле одним виджетом: картинка хранится целиком, а каждый
+    кирпичик рисуется её частью через drawPixmap. После хода
+    перерисовываются только две изменившиеся клетки.
+
+    Ход сразу меняет позицию (puzzle), а кирпичик только догоняет её на
+    экране, поэтому скорость ввода не зависит от анимации. Если игрок ходит
+    быстрее, чем кирпичики доезжают, мешающие скольжения завершаются сразу"""
+
+    def __init__(self, parent, pixmap, puzzle, duration=SLIDE_DURATION):
+        super().__init__(parent)
+        self.pixmap = pixmap
+        self.puzzle = puzzle
+        self.n = puzzle.n
+        self.side = SIZE // self.n
+        self.duration = duration
+        # кирпичик -> (x, y откуда едет, клетка откуда, клетка куда, время начала)
+        self.slides = {}
+        self.clock = QTimer(self)
+        self.clock.setInterval(FRAME_INTERVAL)
+        self.clock.timeout.connect(self.tick)
+        # вызывается с временем начала отрисовки после каждого кадра (замер задержки)
+        self.on_painted = None
+        self.move(0, 0)
+        self.resize(GAP + self.n * (self.side + GAP), GAP + self.n * (self.side + GAP))
+
+    def set_puzzle(self, puzzle):
+        """Новая позиция - перерисовывается всё поле"""
+        self.puzzle = puzzle
+        self.slides.clear()
+        self.clock.stop()
+        self.update()
+
+    def cell_rect(self, index):
+        """Место клетки index на виджете"""
+        row, col = divmod(index, self.n)
+        return QRect(GAP + col * (self.side + GAP), GAP + row * (self.side + GAP),
+                     self.side, self.side)
+
+    def source_rect(self, tile):
+        """Часть картинки, которая изображена на кирпичике tile"""
+        row, col = divmod(tile, self.n)
+        return QRect(col * self.side, row * self.side, self.side, self.side)
+
+    def tile_moved(self, tile, index):
+        """Кирпичик tile переехал в клетку index. Без анимации перерисовываются
+        две клетки, иначе кирпичик начинает скользить из того места, где он
+        сейчас нарисован"""
+        origin = self.puzzle.blank
+        if self.duration <= 0:
+            self.update(self.cell_rect(index))
+            self.update(self.cell_rect(origin))
+            return
+        now = time.perf_counter()
+        if tile in self.slides:
+            # ход назад, пока кирпичик ещё едет
+            start = self.slide_rect(tile, now).topLeft()
+        else:
+            start = self.cell_rect(origin).topLeft()
+        # кирпичик, который ещё не уехал из клетки index, доезжает сразу
+        for other, slide in list(self.slides.items()):
+            if slide[2] == index:
+                self.finish(other)
+        self.slides[tile] = (start.x(), start.y(), origin, index, now)
+        self.update(self.path_rect(tile))
+        if not self.clock.isActive():
+            self.clock.start()
+
+    def slide_rect(self, tile, now):
+        """Где кирпичик tile нарисован в момент now"""
+        x, y, _, target, started = self.slides[tile]
+        progress = min(1.0, (now - started) * 1000 / self.duration)
+        # замедление к концу хода
+        progress = 1 - (1 - progress) ** 2
+        rect = self.cell_rect(target)
+        return QRect(round(x + (rect.x() - x) * progress), round(y + (rect.y() - y) * progress),
+                     self.side, self.side)
+
+    def path_rect(self, tile):
+        """Вся полоса, по которой скользит кирпичик"""
+        x, y, _, target, _ = self.slides[tile]
+        return QRect(x, y, self.side, self.side).united(self.cell_rect(target))
+
+    def finish(self, tile):
+        """Кирпичик сразу встаёт на место"""
+        self.update(self.path_rect(tile))
+        del self.slides[tile]
+
+    def tick(self):
+        """Кадр анимации: перерисовываются полосы всех скользящих кирпичиков,
+        доехавшие убираются из списка"""
+        now = time.perf_counter()
+        for tile, (_, _, _, _, started) in list(self.slides.items()):
+            if (now - started) * 1000 >= self.duration:
+                self.finish(tile)
+            else:
+                self.update(self.path_rect(tile))
+        if not self.slides:
+            self.clock.stop()
+
+    def paintEvent(self, event):
+        """Рисуются только клетки, попавшие в перерисовываемую область. Пустую
+        клетку и промежутки не рисуем вовсе - там виден фон окна"""
+        started = time.perf_counter() if self.on_painted is not None else 0
+        painter = QPainter(self)
+        area = event.rect()
+        step = self.side + GAP
+        cols = range(max(0, (area.left() - GAP) // step), min(self.n, area.right() // step + 1))
+        rows = range(max(0, (area.top() - GAP) // step), min(self.n, area.bottom() // step + 1))
+        blank = self.puzzle.size - 1
+        for row in rows:
+            for col in cols:
+                index = row * self.n + col
+                tile = self.puzzle.tiles[index]
+                if tile != blank and tile not in self.slides:
+                    painter.drawPixmap(self.cell_rect(index), self.pixmap, self.source_rect(tile))
+        if self.slides:
+            now = time.perf_counter()
+            for tile in self.slides:
+                rect = self.slide_rect(tile, now)
+                if rect.intersects(area):
+                    painter.drawPixmap(rect, self.pixmap, self.source_rect(tile))
+        painter.end()
+        if self.on_painted is not None:
+            self.on_painted(started)
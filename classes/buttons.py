@@ -1,7 +1,8 @@
 from PyQt5.QtCore import QSize
-from PyQt5.QtGui import QIcon, QColor
 from PyQt5.QtWidgets import QLabel, QApplication, QPushButton
 from PyQt5 import QtCore
+from classes import assets
+from classes.theme import theme_for
 from tools import SIZE, shadowEffect
 
 
@@ -10,20 +11,22 @@ class PictureButton(QLabel):
 
     def __init__(self, *args, way=None, **kwargs):
         super().__init__(*args, *kwargs)
-        if not way:
-            self.icon = QIcon('icons/arrow.ico')
-        else:
-            self.icon = QIcon(way)
+        way = way or 'icons/arrow.ico'
         # Так как увеличение размера QLabel не увеличит картинку,
-        # находящуюся в нём (PixMap) Растянем картинку отдельно от QLabel,
-        # потому как её формат (svg - формат векторного изображения) позволяет нам сделать это.
-        self.pix = self.icon.pixmap(QSize(SIZE // 20, SIZE // 20))
-        self.big_pix = self.icon.pixmap(QSize(int(SIZE // 20 * 1.25),
-                                              int(SIZE // 20 * 1.25)))
+        # находящуюся в нём (PixMap) Растянем картинку отдельно от QLabel.
+        # Картинки обоих размеров отрисовываются один раз на всё приложение (assets)
+        self.pix = assets.pixmap(way, SIZE // 20)
+        self.big_pix = assets.pixmap(way, int(SIZE // 20 * 1.25))
         self.move(SIZE // 50 + SIZE // 100, SIZE // 25)
         self.setPixmap(self.pix)
         self.resize(SIZE // 20, SIZE // 20)
 
+    def set_pixmaps(self, pix, big_pix):
+        """Смена картинки (при смене темы) без пересоздания кнопки"""
+        self.pix = pix
+        self.big_pix = big_pix
+        self.setPixmap(self.big_pix if self.underMouse() else self.pix)
+
     def enterEvent(self, event):
         """Увеличение размера кнопки при наведении"""
         # Так как в отличие от обычного QPushButton с помощью resize
@@ -49,8 +52,7 @@ class MyButton(QPushButton):
         """Инициализация стилей кнопки"""
         super().__init__(*args, *kwargs)
         self.setStyleSheet(f'border-radius: {SIZE // 50 + SIZE // 100}px;')
-        color = QColor('gray' if args[1].dark_mode else 'black')
-        shadowEffect(self, color)
+        shadowEffect(self, theme_for(args[1].dark_mode).shadow)
 
     def enterEvent(self, event):
         """Изменение стилей кнопки при наведении"""
@@ -0,0 +1,49 @@
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from solver import solve, Cancelled
+
+
+class HintSignals(QObject):
+    """Сигналы фонового поиска подсказки (QRunnable сам сигналы отправлять не умеет)"""
+    found = pyqtSignal(int, list)
+    timed_out = pyqtSignal(int)
+
+
+class HintWorker(QRunnable):
+    """Поиск оптимального решения в пуле потоков, чтобы не подвешивать окно игры.
+    С ограничением budget (с) поиск, не успевший за это время, сдаётся"""
+
+    def __init__(self, puzzle, generation, budget=None):
+        super().__init__()
+        # Поиск ведётся на копии поля: игрок тем временем может ходить
+        self.puzzle = puzzle.copy()
+        self.generation = generation
+        self.budget = budget
+        self.cancelled = False
+        self.signals = HintSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        deadline = None if self.budget is None else time.monotonic() + self.budget
+        try:
+            path = solve(self.puzzle, lambda: self.cancelled or
+                         deadline is not None and time.monotonic() > deadline)
+        except Cancelled:
+            if not self.cancelled:
+                self._emit(self.signals.timed_out, self.generation)
+            return
+        if self.cancelled:
+            return
+        self._emit(self.signals.found, self.generation, path)
+
+    @staticmethod
+    def _emit(signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # окно уже закрыто, и принимать результат некому
+            pass
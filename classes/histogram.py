@@ -0,0 +1,60 @@
+from PyQt5.QtCore import QRect, Qt
+from PyQt5.QtGui import QPainter
+from PyQt5.QtWidgets import QWidget
+
+from classes.theme import theme_for
+
+
+def bucket_labels(edges):
+    """Подписи корзин по нижней границе: '<5 с', '5 с', '10 с', ..., '1 ч'"""
+
+    def short(seconds):
+        if seconds >= 3600:
+            return f'{seconds // 3600} ч'
+        if seconds >= 60:
+            return f'{seconds // 60} мин'
+        return f'{seconds} с'
+
+    return [f'<{short(edges[0])}'] + [short(edge) for edge in edges]
+
+
+class Histogram(QWidget):
+    """Столбчатая диаграмма: высота столбца - доля от самого большого"""
+
+    def __init__(self, parent, dark_mode=False):
+        super().__init__(parent)
+        self.labels = []
+        self.counts = []
+        theme = theme_for(dark_mode)
+        self.bar_color = theme.bar
+        self.text_color = theme.text
+
+    def set_colors(self, bar_color, text_color):
+        self.bar_color = bar_color
+        self.text_color = text_color
+        self.update()
+
+    def set_data(self, labels, counts):
+        self.labels = labels
+        self.counts = counts
+        self.update()
+
+    def paintEvent(self, event):
+        if not self.counts:
+            return
+        painter = QPainter(self)
+        text_height = self.fontMetrics().height()
+        # место под подписи снизу и под числа над столбцами
+        chart = self.height() - 2 * text_height
+        width = self.width() // len(self.counts)
+        highest = max(max(self.counts), 1)
+        for index, (label, count) in enumerate(zip(self.labels, self.counts)):
+            height = chart * count // highest
+            left = index * width
+            painter.fillRect(left + 2, text_height + chart - height, width - 4, height, self.bar_color)
+            painter.setPen(self.text_color)
+            painter.drawText(QRect(left, chart - height, width, text_height),
+                             Qt.AlignCenter, str(count) if count else '')
+            painter.drawText(QRect(left, text_height + chart, width, text_height),
+                             Qt.AlignCenter, label)
+        painter.end()
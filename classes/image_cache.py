@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtGui import QImage
+
+# Вытеснение из памяти: 'lru' - давно не использованные, 'fifo' - самые старые
+POLICIES = ('lru', 'fifo')
+MEMORY_LIMIT = 64 * 2 ** 20
+DISK_LIMIT = 256 * 2 ** 20
+CACHE_DIR = 'data/cache'
+
+
+def cache_key(file_name, clip, side):
+    """Ключ кэша: путь, время изменения файла, способ обрезки и размер.
+    Изменённый файл получит новый ключ, а старая запись со временем вытеснится"""
+    path = os.path.abspath(file_name)
+    crop = 'squeeze' if clip is None else f'crop{clip.x()},{clip.y()},{clip.width()},{clip.height()}'
+    return path, os.stat(path).st_mtime_ns, crop, side
+
+
+class ImageCache:
+    """Двухуровневый кэш уже уменьшенных квадратных картинок: в памяти
+    (ограничен по байтам) и на диске в data/cache. Используется и из главного
+    потока, и из потока загрузки, поэтому все операции под замком"""
+
+    def __init__(self, memory_limit=MEMORY_LIMIT, disk_limit=DISK_LIMIT,
+                 policy='lru', directory=CACHE_DIR):
+        if policy not in POLICIES:
+            raise ValueError(f'unknown eviction policy: {policy}')
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.policy = policy
+        self.directory = directory
+        self.images = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.memory_hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.png')
+
+    def get_memory(self, key):
+        """Картинка из памяти или None (без обращения к диску)"""
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.memory_hits += 1
+                if self.policy == 'lru':
+                    self.images.move_to_end(key)
+            return image
+
+    def get(self, key):
+        """Картинка из памяти, затем с диска. Промах считается здесь"""
+        image = self.get_memory(key)
+        if image is not None:
+            return image
+        path = self.disk_path(key)
+        image = QImage(path) if os.path.exists(path) else QImage()
+        with self.lock:
+            if image.isNull():
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        if self.policy == 'lru':
+            # время изменения - время последнего использования, по нему чистится диск
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        self._remember(key, image)
+        return image
+
+    def put(self, key, image):
+        """Сохранение новой картинки в память и на диск"""
+        self._remember(key, image)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            image.save(self.disk_path(key), 'PNG')
+            self._trim_disk()
+        except OSError:
+            # без кэша на диске игра всё равно работает
+            pass
+
+    def _remember(self, key, image):
+        with self.lock:
+            if key in self.images:
+                return
+            self.images[key] = image
+            self.memory_bytes += image.sizeInBytes()
+            while self.memory_bytes > self.memory_limit and len(self.images) > 1:
+                _, old = self.images.popitem(last=False)
+                self.memory_bytes -= old.sizeInBytes()
+                self.evictions += 1
+
+    def _trim_disk(self):
+        """Удаление давно не использованных файлов (при политике fifo - самых
+        старых), пока кэш на диске больше лимита"""
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)]
+        entries.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(entry) for entry in entries)
+        while total > self.disk_limit and len(entries) > 1:
+            entry = entries.pop(0)
+            total -= os.path.getsize(entry)
+            os.remove(entry)
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.memory_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.images), 'memory_bytes': self.memory_bytes,
+                    'policy': self.policy}
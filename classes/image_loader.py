@@ -0,0 +1,117 @@
+"""Фоновая загрузка картинки для игры.
+
+Замер времени до первого кадра и пикового потребления памяти:
+python -m classes.image_loader photo.jpg photo.png photo.tif"""
+import json
+import subprocess
+import sys
+import time
+
+from PyQt5.QtCore import QObject, QRect, QRunnable, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from tools import SIZE
+
+
+def image_size(file_name):
+    """Размер картинки по заголовку файла, без декодирования"""
+    return QImageReader(file_name).size()
+
+
+def read_image(file_name, clip=None, side=SIZE):
+    """Декодирование сразу с обрезкой и уменьшением до side x side: декодер
+    (например, JPEG) сам пропускает лишнее, и полноразмерная картинка
+    в памяти не появляется"""
+    reader = QImageReader(file_name)
+    reader.setAutoTransform(True)
+    if clip is not None:
+        reader.setClipRect(clip)
+    reader.setScaledSize(QSize(side, side))
+    image = reader.read()
+    if image.isNull():
+        raise OSError(reader.errorString())
+    return image
+
+
+class LoaderSignals(QObject):
+    loaded = pyqtSignal(int, QImage)
+    failed = pyqtSignal(int, str)
+
+
+class ImageLoader(QRunnable):
+    """Загрузка картинки в пуле потоков. QImage, в отличие от QPixmap,
+    можно создавать вне главного потока"""
+
+    def __init__(self, file_name, clip, generation, cache=None, key=None):
+        super().__init__()
+        self.file_name = file_name
+        self.clip = clip
+        self.generation = generation
+        self.cache = cache
+        self.key = key
+        self.cancelled = False
+        self.signals = LoaderSignals()
+
+    def cancel(self):
+        """Само декодирование прервать нельзя, но его результат будет выброшен"""
+        self.cancelled = True
+
+    def run(self):
+        try:
+            image = self.cache.get(self.key) if self.cache is not None else None
+            if image is None:
+                image = read_image(self.file_name, self.clip)
+                if self.cache is not None:
+                    self.cache.put(self.key, image)
+        except OSError as error:
+            result = self.signals.failed, (self.generation, str(error))
+        else:
+            result = self.signals.loaded, (self.generation, image)
+        if self.cancelled:
+            return
+        signal, args = result
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # окно уже закрыто
+            pass
+
+
+def _measure(method, file_name):
+    """Один замер в отдельном процессе, чтобы пик памяти был честным"""
+    import resource
+    from PyQt5.QtGui import QGuiApplication, QPixmap
+    app = QGuiApplication([sys.argv[0], '-platform', 'offscreen'])
+    started = time.perf_counter()
+    size = image_size(file_name)
+    side = min(size.width(), size.height())
+    if method == 'old':
+        # как раньше: полное декодирование в главном потоке, затем обрезка и сжатие
+        pixmap = QPixmap(file_name).copy(QRect(0, 0, side, side)).scaled(SIZE, SIZE)
+    else:
+        pixmap = QPixmap.fromImage(read_image(file_name, QRect(0, 0, side, side)))
+    seconds = time.perf_counter() - started
+    assert not pixmap.isNull()
+    del app
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'seconds': seconds, 'peak_rss_mb': peak}))
+
+
+def main():
+    if len(sys.argv) > 3 and sys.argv[1] == '--method':
+        _measure(sys.argv[2], sys.argv[3])
+        return
+    for file_name in sys.argv[1:]:
+        size = image_size(file_name)
+        print(f'{file_name} ({size.width()} x {size.height()})')
+        for method, title in (('old', 'QPixmap + scaled'), ('new', 'QImageReader')):
+            output = subprocess.run([sys.executable, '-m', 'classes.image_loader', '--method',
+                                     method, file_name], capture_output=True, text=True,
+                                    check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f'  {title:<17} {result["seconds"] * 1000:8.1f} мс   '
+                  f'пик памяти {result["peak_rss_mb"]:7.1f} МБ')
+
+
+if __name__ == '__main__':
+    main()
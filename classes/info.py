@@ -1,5 +1,7 @@
 from PyQt5.QtWidgets import QLabel
-from PyQt5.QtGui import QFont, QFontDatabase
+from PyQt5.QtGui import QFont
+
+from classes.assets import font_family
 
 
 class Information(QLabel):
@@ -7,8 +9,7 @@ class Information(QLabel):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, *kwargs)
-        QFontDatabase.addApplicationFont("data/HoboStd.otf")
-        self.setFont(QFont("Clickuper"))
+        self.setFont(QFont(font_family()))
         self.setStyleSheet(f"""
                     font-size: 8pt;
                     font-bold: bold;
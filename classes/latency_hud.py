@@ -0,0 +1,44 @@
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QLabel
+
+# Как часто обновляются цифры (мс)
+HUD_INTERVAL = 250
+
+
+class LatencyHud(QLabel):
+    """Полупрозрачная панель поверх поля с замерами из latency.LatencyStats"""
+
+    def __init__(self, parent, stats):
+        super().__init__(parent)
+        self.stats = stats
+        self.setStyleSheet('''
+                    background-color: rgba(0, 0, 0, 160);
+                    color: white;
+                    font-family: monospace;
+                    font-size: 9pt;
+                    padding: 4px;
+        ''')
+        self.move(10, 10)
+        self.timer = QTimer(self)
+        self.timer.setInterval(HUD_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.timer.start()
+        self.refresh()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        summary = self.stats.summary()
+        lines = [f'ходов: {summary["moves"]}  ({summary["moves_per_second"]:.0f}/с)']
+        for name, title in (('latency', 'клавиша→кадр'), ('handler', 'обработка'), ('frames', 'кадр')):
+            values = summary[name]
+            lines.append(f'{title:<13} p50 {values["p50"]:6.2f}  p95 {values["p95"]:6.2f}  '
+                         f'p99 {values["p99"]:6.2f} мс')
+        self.setText('\n'.join(lines))
+        self.adjustSize()
+        self.raise_()
@@ -0,0 +1,114 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor
+
+from tools import format_time
+
+# Строк за одно обращение к базе: представление само просит ещё, когда
+# таблицу докручивают до конца
+PAGE_SIZE = 100
+HEADERS = ('name', 'field_size', 'time')
+PLAYER_HEADERS = ('name', 'best', 'average', 'games')
+# Золото, серебро и бронза для первых трёх мест, остальные строки белые
+PODIUM = (QColor(255, 215, 0), QColor(151, 153, 151), QColor(150, 75, 0))
+BACKGROUND = QColor(255, 255, 255)
+
+
+class LeadersModel(QAbstractTableModel):
+    """Рейтинг одной категории, который читается из базы страницами по мере
+    прокрутки. Хранятся только сырые строки, текст и цвет ячеек
+    вычисляются в data() для видимых ячеек"""
+
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.category = None
+        self.leaders = []
+        self.exhausted = True
+
+    def set_category(self, rows, cols, level):
+        """Переключение на другой размер поля или уровень: загружается только
+        первая страница"""
+        self.beginResetModel()
+        self.category = rows, cols, level
+        self.leaders = self.service.page(rows, cols, None, PAGE_SIZE, level)
+        self.exhausted = len(self.leaders) < PAGE_SIZE
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.leaders)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        last_id, _, _, last_time = self.leaders[-1]
+        rows, cols, level = self.category
+        more = self.service.page(rows, cols, (last_time, last_id), PAGE_SIZE, level)
+        self.exhausted = len(more) < PAGE_SIZE
+        if more:
+            self.beginInsertRows(QModelIndex(), len(self.leaders), len(self.leaders) + len(more) - 1)
+            self.leaders.extend(more)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            # строки из базы: (id, name, field_size, time)
+            value = self.leaders[row][index.column() + 1]
+            return format_time(value) if index.column() == 2 else str(value)
+        if role == Qt.BackgroundRole:
+            return PODIUM[row] if row < len(PODIUM) else BACKGROUND
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return HEADERS[section] if orientation == Qt.Horizontal else str(section + 1)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled
+
+
+class PlayerStatsModel(QAbstractTableModel):
+    """Лучшие игроки категории с лучшим и средним временем и числом партий"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.players = []
+
+    def set_players(self, players):
+        """players: строки leaderboard.player_stats (name, best, games, average)"""
+        self.beginResetModel()
+        self.players = players
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.players)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(PLAYER_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        name, best, games, average = self.players[index.row()]
+        value = (name, best, average, games)[index.column()]
+        if value is None:
+            # результат пришёл импортом, партии не учитывались
+            return '-'
+        return format_time(value) if index.column() in (1, 2) else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return PLAYER_HEADERS[section] if orientation == Qt.Horizontal else str(section + 1)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled
@@ -1,20 +1,66 @@
-from PyQt5.QtGui import QIcon, QFontDatabase, QKeyEvent, QPixmap, QFont, QColor
-from PyQt5.QtWidgets import QMainWindow, QLabel, QTableWidget, QAbstractItemView, QHeaderView, \
-    QInputDialog, QFileDialog, QTableWidgetItem, QComboBox, QPlainTextEdit
-from PyQt5.QtCore import QRect, Qt, QSize, QEvent
+from PyQt5.QtGui import QKeyEvent, QPixmap, QFont, QColor
+from PyQt5.QtWidgets import QMainWindow, QLabel, QTableView, QAbstractItemView, QHeaderView, \
+    QInputDialog, QFileDialog, QComboBox, QPlainTextEdit
+from PyQt5.QtCore import QRect, Qt, QEvent, QThreadPool, QTimer, pyqtSignal
 
 import time
-from random import choice
+from collections import deque
+from random import Random
 
+from classes import assets
 from classes.buttons import MyButton, PictureButton
 from classes.info import Information
 from classes.titles import Title, SubTitle
+from classes.board import Board, GAP
 from classes.frame import Frame
+from classes.hint import HintWorker
+from classes.image_cache import ImageCache, cache_key
+from classes.image_loader import ImageLoader, image_size
+from classes.histogram import Histogram, bucket_labels
+from classes.leaders_model import LeadersModel, PlayerStatsModel
+from classes.latency_hud import LatencyHud
+from classes.replay_view import ReplayView
+from classes.theme import THEMES, theme_for
+from difficulty import EXACT_MAX_SIDE, LEVELS, ScramblePool, generate, has_levels, played_level
+from engine import UP, DOWN, LEFT, RIGHT
+from latency import LatencyStats
+from leaderboard import HISTOGRAM_EDGES, UNNAMED, parse_size
+import pattern_db
+import row_solver
+from replay import Recording
 from tools import *
 
+KEY_TO_DIRECTION = {Qt.Key_Up: UP, Qt.Key_Down: DOWN, Qt.Key_Left: LEFT, Qt.Key_Right: RIGHT}
+ARROWS = {UP: '↑', DOWN: '↓', LEFT: '←', RIGHT: '→'}
+# Оптимальное решение в разумное время находится только для небольших полей:
+# до HINT_MAX_SIDE оно ищется в фоне сразу после каждого хода, а на 4 x 4 -
+# только с собранными базами шаблонов (pattern_db.py) и только по нажатию H,
+# чтобы перебор не отнимал у окна GIL всю партию. Даже с базами сложная
+# позиция 4 x 4 решается на чистом Python десятки секунд, поэтому поиск
+# на 4 x 4 сдаётся через PATTERN_HINT_BUDGET (с)
+HINT_MAX_SIDE = 3
+PATTERN_HINT_SIDE = 4
+PATTERN_HINT_BUDGET = 2
+# Автосборка: пауза между ходами и наибольшая длительность показа (мс),
+# а также задержка перед возвратом в меню
+AUTO_SOLVE_INTERVAL = 120
+AUTO_SOLVE_DURATION = 10000
+AUTO_SOLVE_DELAY = 1500
+# Политика вытеснения кэша картинок: 'lru' или 'fifo' (см. classes/image_cache.py)
+IMAGE_CACHE_POLICY = 'lru'
+# Шрифт кнопок настроек и заголовков окон
+SMALL_FONT = QFont(COOL_FONT)
+SMALL_FONT.setPointSize(SIZE // 50)
+# Окна, кроме главного меню, достраиваются в простое через PREBUILD_DELAY мс
+# после запуска; без этого каждое окно строится при первом показе
+PREBUILD_SCREENS = True
+PREBUILD_DELAY = 300
+
 
 class MainWindow(QMainWindow):
     """Класс окна приложения"""
+    # поток записи результатов сообщил, что очередь пуста (см. results_written)
+    results_saved = pyqtSignal()
 
     def __init__(self):
         """Подготовка приложения к запуску"""
@@ -23,7 +69,9 @@ class MainWindow(QMainWindow):
         # Инициализация непосредственно таблицы лидеров, и специального файла,
         # для хранения таблицы, если его ещё не существует в директории (FROM TOOLS.PY):
         make_game_files(self)
-        self.leaders = []
+        # рейтинг и статистика читаются без ожидания записи, а после неё перечитываются
+        self.results_saved.connect(self.results_written)
+        self.leaderboard.on_written = self.results_saved.emit
         # Словарь, в котором хранятся контейнеры окон приложения,
         # содержащие соответствующие виджеты окна.
         self.window_widgets = {
@@ -31,7 +79,9 @@ class MainWindow(QMainWindow):
             "game": [],
             "settings": [],
             "leader_board": [],
-            "tips": []}
+            "tips": [],
+            "loading": [],
+            "stats": []}
 
         self.setWindowTitle('Пятнашки')
         self.setGeometry(100, 100, 0, 0)
@@ -39,24 +89,64 @@ class MainWindow(QMainWindow):
         self.in_progress = True
         self.is_drawing = False
         self.dark_mode = False
-        self.setWindowIcon(QIcon('icons/Window_icon.jpg'))
+        self.setWindowIcon(assets.icon('icons/Window_icon.jpg'))
         self.statusBar().showMessage(VERSION)
         # В игре существуют режимы сложности, градация которых
         # связана с увеличением размера игрового поля
         # (выше сложность - больше поле, собирать его будет сложнее)
-        self.num_of_br = {'4 x 4': 16, '3 x 3': 9, '2 x 2': 4}
+        # Поле рисуется одним виджетом, поэтому размер не ограничен тремя
+        # кнопками в настройках: остальные выбираются из списка
+        self.num_of_br = {'16 x 16': 256, '10 x 10': 100, '8 x 8': 64, '5 x 5': 25,
+                          '4 x 4': 16, '3 x 3': 9, '2 x 2': 4}
         # По умолчанию уровень сложности установлен простой,
         # для демонстрации работы приложения.
         self.difficulty = "2 x 2"
         self.number_of_bricks = self.num_of_br[self.difficulty]
+        self.level = LEVELS[0]
+        # Позиции нужной сложности готовятся заранее в фоновом потоке
+        self.scramble_pool = ScramblePool()
+        self.scramble_pool.prefill(int(self.number_of_bricks ** 0.5), self.level)
         self.n = 0
-        self.cords_mtx = []
-        QFontDatabase.addApplicationFont("fonts/HoboStd.otf")
+        self.puzzle = None
+        self.seed = None
+        # уровень, с которым результат попадёт в таблицу лидеров (см. field_generation)
+        self.played_level = LEVELS[0]
+        self.recording = None
+        self.replay_view = None
+        # Замер задержки ходов (F3), по умолчанию выключен
+        self.latency = None
+        self.latency_hud = None
+        self.board = None
+        # Картинка загружается в пуле потоков, устаревшие загрузки отбрасываются
+        self.loader = None
+        self.loading_generation = 0
+        self.image_cache = ImageCache(policy=IMAGE_CACHE_POLICY)
+        # Подсказки ищутся в фоне, результат устаревшего поиска отбрасывается
+        self.hint_path = None
+        self.hint_worker = None
+        self.hint_generation = 0
+        self.hint_wanted = False
+        self.hints_ready = False
+        # Автосборка проигрывает ходы решения по таймеру
+        self.auto_path = None
+        self.auto_timer = QTimer(self)
+        self.auto_timer.timeout.connect(self.auto_solve_step)
+        # Окна строятся при первом показе, чтобы до появления меню
+        # не создавались виджеты остальных окон и не читалась база
+        self.builders = {
+            "main_menu": self.init_main_menu,
+            "settings": self.init_settings,
+            "leader_board": self.init_leader_board,
+            "tips": self.init_tips,
+            "loading": self.init_loading,
+            "stats": self.init_stats}
+        self.built = set()
+        self.go_to_menu_btn = None
+        assets.font_family()
         self.init_ui()
-        if self.dark_mode:
-            self.setStyleSheet(open('css/_styles.CSS').read())
-        else:
-            self.setStyleSheet(open('css/styles.CSS').read())
+        if PREBUILD_SCREENS:
+            QTimer.singleShot(PREBUILD_DELAY, self.prebuild)
+        self.apply_theme()
 
     def clear_window(self):
         """Скрытие всех элементов с экрана приложения"""
@@ -64,13 +154,64 @@ class MainWindow(QMainWindow):
         clear(self.window_widgets.values())
 
     def show_widgets(self, window):
-        """Вывод окна 'window' на экран приложения"""
+        """Вывод окна 'window' на экран приложения (с постройкой при первом показе)"""
+        if window in self.builders and window not in self.built:
+            self.build(window)
         # from tools.py
         show(self.window_widgets.get(window, "main_menu"))
 
+    def apply_theme(self):
+        """Перекраска уже созданных виджетов под текущую тему. Виджеты не
+        пересоздаются, а стили и картинки темы готовятся один раз (classes/theme.py)"""
+        theme = theme_for(self.dark_mode)
+        self.setStyleSheet(theme.stylesheet)
+        for widget in self.findChildren(MyButton) + self.findChildren(SubTitle):
+            widget.graphicsEffect().setColor(theme.shadow)
+        if self.go_to_menu_btn is not None:
+            self.go_to_menu_btn.set_pixmaps(theme.arrow, theme.big_arrow)
+        if "tips" in self.built:
+            self.reference.setStyleSheet(theme.reference)
+        if "leader_board" in self.built:
+            self.sort_by_difficulty.setStyleSheet(theme.combo)
+            self.leaders_level.setStyleSheet(theme.combo)
+        if "stats" in self.built:
+            self.stats_size.setStyleSheet(theme.combo)
+            self.stats_level.setStyleSheet(theme.combo)
+            self.stats_histogram.set_colors(theme.bar, theme.text)
+
     def init_ui(self):
-        """Инициализация вспомогательных окон приложения (всех кроме окна игры)"""
+        """Инициализация приложения: строится только главное меню, остальные
+        окна создаются при первом показе (show_widgets) или в простое (prebuild)"""
+        self.show_widgets("main_menu")
+
+    def build(self, window):
+        """Создание виджетов окна 'window'. Каждое окно строится один раз"""
+        self.built.add(window)
+        shared = self.go_to_menu_btn
+        self.builders[window]()
+        # только что созданные виджеты не должны появиться поверх текущего окна,
+        # а общая кнопка возврата в меню, созданная раньше, может быть на нём
+        clear(widget for widget in self.window_widgets[window]
+              if shared is None or widget is not shared)
+
+    def prebuild(self):
+        """Достройка одного ещё не созданного окна за такт цикла событий,
+        чтобы окно не замирало, пока строятся все сразу"""
+        for window in self.builders:
+            if window not in self.built:
+                self.build(window)
+                QTimer.singleShot(0, self.prebuild)
+                return
 
+    def menu_button(self):
+        """Кнопка возврата в главное меню, общая для всех окон"""
+        if self.go_to_menu_btn is None:
+            self.go_to_menu_btn = PictureButton(self, way=THEMES[self.dark_mode]['arrow'])
+            self.go_to_menu_btn.id = GO_TO_MAIN_MENU_BTN_ID
+            self.go_to_menu_btn.installEventFilter(self)
+        return self.go_to_menu_btn
+
+    def init_main_menu(self):
         """ ИНИЦИАЛИЗАЦИЯ МЕНЮ """
         name_of_game = Title('Пятнашки', self)
         name_of_game.resize(SIZE // 5 * 2 + SIZE // 25, SIZE // 50 * 6)
@@ -116,16 +257,9 @@ class MainWindow(QMainWindow):
 
         self.window_widgets["main_menu"].append(info_btn)
 
+    def init_settings(self):
         """ ИНИЦИАЛИЗАЦИЯ НАСТРОЕК ПРИЛОЖЕНИЯ (Сложности игры) """
-
-        if self.dark_mode:
-            go_to_menu_btn = PictureButton(self, way='icons/_arrow.ico')
-        else:
-            go_to_menu_btn = PictureButton(self)
-        go_to_menu_btn.id = GO_TO_MAIN_MENU_BTN_ID
-        go_to_menu_btn.installEventFilter(self)
-
-        self.window_widgets["settings"].append(go_to_menu_btn)
+        self.window_widgets["settings"].append(self.menu_button())
 
         section_title = SubTitle('Настройки', self)
 
@@ -146,11 +280,9 @@ class MainWindow(QMainWindow):
 
         self.window_widgets["settings"].append(difficulty)
 
-        COOL_FONT.setPointSize(SIZE // 50)
-
         difficulty_easy = MyButton('2 x 2', self)
         difficulty_easy.id = EASY_BTN_ID
-        difficulty_easy.setFont(COOL_FONT)
+        difficulty_easy.setFont(SMALL_FONT)
         difficulty_easy.resize(SIZE // 5 + SIZE // 10, SIZE // 5)
         difficulty_easy.move(SIZE // 50, SIZE // 5 + SIZE // 50 * 4)
         difficulty_easy.installEventFilter(self)
@@ -159,7 +291,7 @@ class MainWindow(QMainWindow):
 
         difficulty_medium = MyButton('3 x 3', self)
         difficulty_medium.id = NORMAL_BTN_ID
-        difficulty_medium.setFont(COOL_FONT)
+        difficulty_medium.setFont(SMALL_FONT)
         difficulty_medium.resize(SIZE // 5 + SIZE // 10, SIZE // 5)
         difficulty_medium.move(SIZE // 5 + SIZE // 20 * 3, SIZE // 5 + SIZE // 50 * 4)
         difficulty_medium.installEventFilter(self)
@@ -168,16 +300,51 @@ class MainWindow(QMainWindow):
 
         difficulty_hard = MyButton('4 x 4', self)
         difficulty_hard.id = HARD_BTN_ID
-        difficulty_hard.setFont(COOL_FONT)
+        difficulty_hard.setFont(SMALL_FONT)
         difficulty_hard.resize(SIZE // 5 + SIZE // 10, SIZE // 5)
         difficulty_hard.move(SIZE // 5 * 3 + SIZE // 50 * 4, SIZE // 5 + SIZE // 50 * 4)
         difficulty_hard.installEventFilter(self)
 
         self.window_widgets["settings"].append(difficulty_hard)
 
+        self.size_choice = QComboBox(self)
+        self.size_choice.setFont(SMALL_FONT)
+        self.size_choice.resize(SIZE // 5 + (SIZE // 100 * 7), SIZE // 20)
+        self.size_choice.move((SIZE - self.size_choice.size().width()) // 2, SIZE // 100 * 49)
+        self.size_choice.addItems(sorted(self.num_of_br, key=self.num_of_br.get))
+        self.size_choice.setCurrentText(self.difficulty)
+        self.size_choice.currentTextChanged.connect(self.change_size)
+
+        self.window_widgets["settings"].append(self.size_choice)
+
+        level = QLabel('Сложность', self)
+        level.setFont(SMALL_FONT)
+        level.resize(SIZE // 5 + (SIZE // 100 * 7), SIZE // 10)
+        level.setAlignment(Qt.AlignVCenter | Qt.AlignHCenter)
+        level.move((SIZE - level.size().width()) // 2, SIZE // 100 * 57)
+        level.setStyleSheet(f'''
+                            border-radius: {SIZE // 100 + SIZE // 50}px;
+                            color: white;
+                            background-color: black;
+                            font-size: {SIZE // 40}pt;
+                        ''')
+
+        self.window_widgets["settings"].append(level)
+
+        # Уровень задаёт пределы длины кратчайшего решения (см. difficulty.py)
+        self.level_choice = QComboBox(self)
+        self.level_choice.setFont(SMALL_FONT)
+        self.level_choice.resize(SIZE // 5 + (SIZE // 100 * 7), SIZE // 20)
+        self.level_choice.move((SIZE - self.level_choice.size().width()) // 2, SIZE // 100 * 68)
+        self.level_choice.addItems(LEVELS)
+        self.level_choice.setCurrentText(self.level)
+        self.level_choice.currentTextChanged.connect(self.change_level)
+
+        self.window_widgets["settings"].append(self.level_choice)
+
         dark_button = MyButton('', self)
         dark_button.id = DARK_MODE_BTN_ID
-        dark_button.setFont(COOL_FONT)
+        dark_button.setFont(SMALL_FONT)
         dark_button.resize(SIZE // 10, SIZE // 10)
         dark_button.move(SIZE // 100 * 95, SIZE // 100 * 95)
         dark_button.installEventFilter(self)
@@ -223,14 +390,13 @@ class MainWindow(QMainWindow):
         #
         # self.window_widgets["settings"].append(music_sld)
 
+    def init_tips(self):
         """ ИНИЦИАЛИЗАЦИЯ ОКНА ОБУЧЕНИЯ """
-
         section_title = SubTitle('Обучение', self)
 
         self.window_widgets["tips"].append(section_title)
 
-        # go_to_menu_btn уже была инициализирована ранее.
-        self.window_widgets["tips"].append(go_to_menu_btn)
+        self.window_widgets["tips"].append(self.menu_button())
 
         fine_layout = Frame('', self)
         fine_layout.resize(int(SIZE // 1.25 + SIZE // 6.25), int(SIZE // 5 + SIZE // 100))
@@ -244,7 +410,7 @@ class MainWindow(QMainWindow):
         # потому как её формат (svg - формат векторного изображения) позволяет нам сделать это.
         self.pix = self.icon.pixmap(QSize(SIZE // 20, SIZE // 20))
         '''
-        arrows_pix = QIcon('icons/keyboard.ico').pixmap(QSize(SIZE // 3, SIZE // 3))
+        arrows_pix = assets.pixmap('icons/keyboard.ico', SIZE // 3)
         arrows = QLabel(self)
         arrows.resize(SIZE // 3, SIZE // 3)
         arrows.move(SIZE // 25, SIZE // 20 + SIZE // 50)
@@ -264,77 +430,51 @@ class MainWindow(QMainWindow):
 
         self.window_widgets["tips"].append(explanation_to_arrows)
 
-        reference = QPlainTextEdit('', self)
-        reference.resize(int(SIZE // 1.25 + SIZE // 6.25), int(SIZE // 1.6 + SIZE // 100))
-        reference.move(SIZE // 50, int(SIZE // 5 + SIZE // 6.6))
-        if self.dark_mode:
-            reference.setStyleSheet(
-                """
-                                color: black;
-                                border: 1px solid white;
-                                border-radius: 5px;
-                                background: gray;
-                """)
-        else:
-            reference.setStyleSheet(
-                """
-                                color: black;
-                                border: 1px solid black;
-                                border-radius: 5px;
-                                background: #d4d4d4;
-                """)
-        reference.setFont(QFont("fonts/HoboStd.odt", 15))
-        reference.setReadOnly(True)
-        reference.setPlainText(open("ref/Reference.txt", 'r', encoding='utf8').read())
-
-        self.window_widgets["tips"].append(reference)
+        self.reference = QPlainTextEdit('', self)
+        self.reference.resize(int(SIZE // 1.25 + SIZE // 6.25), int(SIZE // 1.6 + SIZE // 100))
+        self.reference.move(SIZE // 50, int(SIZE // 5 + SIZE // 6.6))
+        self.reference.setStyleSheet(theme_for(self.dark_mode).reference)
+        self.reference.setFont(QFont(assets.font_family(), 15))
+        self.reference.setReadOnly(True)
+        self.reference.setPlainText(assets.text("ref/Reference.txt"))
 
-        """ ИНИЦИАЛИЗАЦИЯ ОКНА С ТАБЛИЦЕЙ ЛИДЕРОВ """
+        self.window_widgets["tips"].append(self.reference)
 
-        # go_to_menu_btn уже была инициализирована ранее.
-        self.window_widgets["leader_board"].append(go_to_menu_btn)
+    def init_leader_board(self):
+        """ ИНИЦИАЛИЗАЦИЯ ОКНА С ТАБЛИЦЕЙ ЛИДЕРОВ """
+        self.window_widgets["leader_board"].append(self.menu_button())
 
         section_title = SubTitle('Таблица лидеров', self)
         section_title.setAlignment(Qt.AlignVCenter | Qt.AlignHCenter)
         section_title.move(SIZE // 5 + SIZE // 100 * 7, SIZE // 100)
         section_title.resize(SIZE // 2 - SIZE // 25, SIZE // 10)
-        section_title.setFont(COOL_FONT)
+        section_title.setFont(SMALL_FONT)
         section_title.setStyleSheet(f'''font-size: {SIZE // 30}pt;''')
         self.window_widgets["leader_board"].append(section_title)
         self.sort_by_difficulty = QComboBox(self)
-        if self.dark_mode:
-            self.sort_by_difficulty.setStyleSheet("""
-                        background-color:  #cfcfcf;
-                        QComboBox::down-arrow
-                                                 {
-                                                 border : 2px solid black;
-                                                 border-width : 5px 1px 10px 3px;
-                                                 color: #cfcfcf
-                                                 };
-                    border:                 none;
-                     """)
-        else:
-            self.sort_by_difficulty.setStyleSheet("""
-                background-color:  white;
-                QComboBox::down-arrow
-                                         {
-                                         border : 2px solid black;
-                                         border-width : 5px 1px 10px 3px;
-                                         };
-            border:                 none;
-             """)
-
+        self.sort_by_difficulty.setStyleSheet(theme_for(self.dark_mode).combo)
         self.sort_by_difficulty.resize(SIZE // 25 * 4, SIZE // 20)
         self.sort_by_difficulty.move(SIZE // 5 * 4 + SIZE // 50 + SIZE // 100,
                                      SIZE // 20 + SIZE // 50)
-        self.sort_by_difficulty.addItem('2 x 2')
-        self.sort_by_difficulty.addItem('3 x 3')
-        self.sort_by_difficulty.addItem('4 x 4')
+        self.sort_by_difficulty.addItems(sorted(self.num_of_br, key=self.num_of_br.get))
         self.sort_by_difficulty.currentTextChanged.connect(self.tbl_update)
 
         self.window_widgets["leader_board"].append(self.sort_by_difficulty)
 
-        self.leader_board = QTableWidget(self)
+        # у каждого уровня сложности свой рейтинг (см. leaderboard.ANY_LEVEL)
+        self.leaders_level = QComboBox(self)
+        self.leaders_level.setStyleSheet(self.sort_by_difficulty.styleSheet())
+        self.leaders_level.resize(self.sort_by_difficulty.size())
+        self.leaders_level.move(self.sort_by_difficulty.x(), SIZE // 100)
+        self.leaders_level.addItems(LEVELS)
+        self.leaders_level.currentTextChanged.connect(self.tbl_update)
+        self.window_widgets["leader_board"].append(self.leaders_level)
+
+        self.leader_board = QTableView(self)
+        self.leaders_model = LeadersModel(self.leaderboard, self)
+        self.leader_board.setModel(self.leaders_model)
+        # двойной щелчок по результату открывает запись партии
+        self.leader_board.doubleClicked.connect(self.show_replay)
         self.leader_board.setFixedSize(SIZE + 3, SIZE - (SIZE // 50 * 6))
         self.leader_board.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.leader_board.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
@@ -345,26 +485,91 @@ class MainWindow(QMainWindow):
         self.exp.move(100, 200)
         self.window_widgets["leader_board"].append(self.exp)
 
-        self.tbl_update()
-
+        # таблица заполняется при показе окна (leader_board_show)
         self.window_widgets["leader_board"].append(self.leader_board)
 
-        self.clear_window()
-        self.show_widgets("main_menu")
+        stats_btn = MyButton('Статистика', self)
+        stats_btn.id = STATS_BTN_ID
+        stats_btn.setFont(QFont(COOL_FONT.family(), SIZE // 75))
+        stats_btn.resize(SIZE // 25 * 4, SIZE // 20)
+        stats_btn.move(SIZE // 10, SIZE // 20 + SIZE // 50)
+        stats_btn.installEventFilter(self)
+        self.window_widgets["leader_board"].append(stats_btn)
+
+    def init_stats(self):
+        """ ИНИЦИАЛИЗАЦИЯ ОКНА СТАТИСТИКИ """
+        # список размеров повторяет список из таблицы лидеров
+        if "leader_board" not in self.built:
+            self.build("leader_board")
+        self.window_widgets["stats"].append(self.menu_button())
+
+        section_title = SubTitle('Статистика', self)
+        section_title.setAlignment(Qt.AlignVCenter | Qt.AlignHCenter)
+        section_title.move(SIZE // 5 + SIZE // 100 * 7, SIZE // 100)
+        section_title.resize(SIZE // 2 - SIZE // 25, SIZE // 10)
+        section_title.setFont(SMALL_FONT)
+        section_title.setStyleSheet(f'''font-size: {SIZE // 30}pt;''')
+        self.window_widgets["stats"].append(section_title)
+
+        self.stats_size = QComboBox(self)
+        self.stats_size.setStyleSheet(self.sort_by_difficulty.styleSheet())
+        self.stats_size.resize(self.sort_by_difficulty.size())
+        self.stats_size.move(self.sort_by_difficulty.pos())
+        self.stats_size.addItems(sorted(self.num_of_br, key=self.num_of_br.get))
+        self.stats_size.currentTextChanged.connect(self.stats_update)
+        self.window_widgets["stats"].append(self.stats_size)
+
+        self.stats_level = QComboBox(self)
+        self.stats_level.setStyleSheet(self.leaders_level.styleSheet())
+        self.stats_level.resize(self.leaders_level.size())
+        self.stats_level.move(self.leaders_level.pos())
+        self.stats_level.addItems(LEVELS)
+        self.stats_level.currentTextChanged.connect(self.stats_update)
+        self.window_widgets["stats"].append(self.stats_level)
+
+        # Процентили лучших времён игроков
+        self.stats_summary = QLabel(self)
+        self.stats_summary.setAlignment(Qt.AlignVCenter | Qt.AlignHCenter)
+        self.stats_summary.resize(SIZE, SIZE // 20)
+        self.stats_summary.move(0, SIZE // 50 * 6)
+        self.window_widgets["stats"].append(self.stats_summary)
+
+        self.stats_histogram = Histogram(self, self.dark_mode)
+        self.stats_histogram.resize(SIZE - SIZE // 25, SIZE // 3)
+        self.stats_histogram.move(SIZE // 50, SIZE // 50 * 9)
+        self.window_widgets["stats"].append(self.stats_histogram)
+
+        self.players_model = PlayerStatsModel(self)
+        players = QTableView(self)
+        players.setModel(self.players_model)
+        players.setFixedSize(SIZE + 3, SIZE - SIZE // 50 * 9 - SIZE // 3 - SIZE // 50)
+        players.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        players.move(0, SIZE // 50 * 10 + SIZE // 3)
+        self.window_widgets["stats"].append(players)
+
+    def init_loading(self):
+        """ ИНИЦИАЛИЗАЦИЯ ОКНА ЗАГРУЗКИ КАРТИНКИ """
+        # кнопка возврата в меню здесь же отменяет загрузку
+        self.window_widgets["loading"].append(self.menu_button())
+
+        section_title = SubTitle('Загрузка...', self)
+        section_title.move((SIZE - section_title.size().width()) // 2,
+                           (SIZE - section_title.size().height()) // 2)
+        self.window_widgets["loading"].append(section_title)
 
     def start_game(self):
-        """Инициализация алгоритмов самой игры и всех окон, связанных с её началом"""
+        """Выбор картинки и запуск её загрузки в фоне. Пока картинка
+        декодируется, показывается экран загрузки, с которого можно уйти в меню"""
         self.statusBar().showMessage('')
-        self.in_progress = False
         file_name = self.dialog()
         if not file_name:
-            self.in_progress = True
             return
 
-        pix_map = QPixmap(file_name)
-        size = pix_map.size()
-        if size.width() == 0 or size.height() == 0:
+        # размер известен из заголовка файла, сама картинка ещё не декодирована
+        size = image_size(file_name)
+        if size.width() <= 0 or size.height() <= 0:
             return
+        clip = None
         if size.width() != size.height():
             # проверяется тот факт, что картинка квадратная, если нет пользователь может её
             # отредактировать
@@ -378,56 +583,73 @@ class MainWindow(QMainWindow):
             if ok_pressed:
                 if name == 'Обрезать лишнее':
                     min_side = min(size.width(), size.height())
-                    rectangle = QRect(0, 0, min_side, min_side)
-                    pix_map = pix_map.copy(rectangle)
-                    self.clear_window()
+                    clip = QRect(0, 0, min_side, min_side)
             else:
                 self.statusBar().showMessage(VERSION)
-                self.in_progress = True
                 return
+        self.cancel_loading()
+        # та же картинка, уже уменьшенная в прошлой игре, берётся из памяти сразу
+        key = cache_key(file_name, clip, SIZE)
+        image = self.image_cache.get_memory(key)
+        if image is not None:
+            self.begin_game(QPixmap.fromImage(image))
+            return
+        self.clear_window()
+        self.show_widgets("loading")
+        self.statusBar().showMessage('Загрузка картинки...')
+        # обрезка и уменьшение до SIZE x SIZE происходят прямо при декодировании,
+        # а результат сохраняется в кэш (в памяти и в data/cache)
+        self.loading_generation += 1
+        self.loader = ImageLoader(file_name, clip, self.loading_generation,
+                                  self.image_cache, key)
+        self.loader.signals.loaded.connect(self.image_loaded)
+        self.loader.signals.failed.connect(self.image_failed)
+        QThreadPool.globalInstance().start(self.loader)
+
+    def cancel_loading(self):
+        """Отмена загрузки картинки (игрок ушёл с экрана загрузки)"""
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+
+    def image_loaded(self, generation, image):
+        if generation != self.loading_generation or self.loader is None:
+            return
+        self.loader = None
+        self.begin_game(QPixmap.fromImage(image))
+
+    def image_failed(self, generation, error):
+        if generation != self.loading_generation or self.loader is None:
+            return
+        self.loader = None
+        self.clear_window()
+        self.show_widgets("main_menu")
+        self.statusBar().showMessage(f'Не удалось открыть картинку: {error}')
+
+    def begin_game(self, pix_map):
+        """Инициализация алгоритмов самой игры и всех окон, связанных с её началом"""
         self.clear_window()
-        # "разрезаем" изображение и и раскладываем каждый в свой pixmap
-        pix_map = pix_map.scaled(SIZE, SIZE)
+        self.statusBar().showMessage('')
+        self.in_progress = False
+        # картинка не режется на части: поле рисует каждый кирпичик прямо
+        # из общего pixmap (см. classes/board.py)
         self.n = int(self.number_of_bricks ** 0.5)
-        pix_map_list = []
-        for i in range(1, self.n + 1):
-            for j in range(1, self.n + 1):
-                if i == self.n and self.n == j:
-                    break
-                x1, y1 = (i - 1) * (SIZE // self.n), (j - 1) * (SIZE // self.n)
-                rectangle = QRect(x1, y1, SIZE // self.n, SIZE // self.n)
-                pix_map_list.append((pix_map.copy(rectangle), (i - 1, j - 1)))
-
-        # раскладываем каждый pixmap в свой Qlable, заводим систему координат,
-        # чтобы можно было понять, когда картинка собрана и где что находится.
-        self.cords_mtx = []
-        i = j = 0
-        for i in range(1, self.n + 1):
-            cords = []
-            images = []
-            for j in range(1, self.n + 1):
-                image = QLabel(self)
-                image.move(5 + (i - 1) * (SIZE // self.n + 5), 5 + (j - 1)
-                           * (SIZE // self.n + 5))
-                image.resize(SIZE // self.n, SIZE // self.n)
-                if i == self.n == j:
-                    cords.append((i - 1, j - 1))
-                    images.append(None)
-                    self.start_pos = (i - 1, j - 1)
-                    break
-                pixmap = pix_map_list.pop(0)
-                image.setPixmap(pixmap[0])
-                cords.append(pixmap[1])
-                images.append(image)
-            self.cords_mtx.append(cords)
-            self.window_widgets["game"].append(images)
-
-        self.setFixedSize(5 + SIZE + 5 * i, 5 + SIZE + 5 * j)
-        self.field_generation()
 
-        # проверка на мгновенный выйгрыш
-        while win_check(self.cords_mtx):
-            self.field_generation()
+        self.setFixedSize(GAP + SIZE + GAP * self.n, GAP + SIZE + GAP * self.n)
+        self.field_generation()
+        if self.played_level != played_level(self.n, self.level):
+            self.statusBar().showMessage(f'Уровни {self.difficulty} ещё готовятся: позиция случайная, '
+                                         f'результат попадёт в категорию «{self.played_level}»')
+        self.board = Board(self, pix_map, self.puzzle)
+        self.window_widgets["game"] = [self.board]
+        if self.latency is not None:
+            self.latency.reset()
+            self.board.on_painted = self.latency.painted
+            self.window_widgets["game"].append(self.latency_hud)
+        self.hint_wanted = False
+        self.hints_ready = self.n <= HINT_MAX_SIDE or (self.n == PATTERN_HINT_SIDE and
+                                                      pattern_db.load(self.n) is not None)
+        self.restart_hint()
         self.show_widgets("game")
         self.start_time = time.time()
         self.update()
@@ -437,7 +659,7 @@ class MainWindow(QMainWindow):
         """Открытие окна настроек игры"""
         self.clear_window()
         self.show_widgets("settings")
-        self.statusBar().showMessage(f'Размер поля: {self.difficulty}')
+        self.update_level_choice()
 
     def tips(self):
         """Открытие окна справки по игре и советов по собиранию 'Пятнашек'"""
@@ -452,148 +674,180 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage('')
         self.tbl_update()
 
-    def field_generation(self):
-        """Поле генерируется с помощью 1000 ходов, это могут быть
-         правильные и неправильные ходы,
-        программа мешает кирпичики не случайным образом,
-         а как бы запутывает головоломку, делая случайный ход"""
-        for _ in range(1000):
-            key = choice((Qt.Key_Down, Qt.Key_Up, Qt.Key_Left, Qt.Key_Right))
-            self.move_check(key)
+    def show_replay(self, index):
+        """Просмотр записи партии, которой поставлен выбранный результат"""
+        leader_id, name, field_size, _ = self.leaders_model.leaders[index.row()]
+        recording = self.leaderboard.recording_of(leader_id)
+        if recording is None:
+            self.statusBar().showMessage('Для этого результата нет записи партии')
+            return
+        self.replay_view = ReplayView(recording, f'{name} ({field_size})')
+        self.replay_view.show()
+
+    def stats_show(self):
+        """Открытие окна статистики для размера, выбранного в таблице лидеров"""
+        self.clear_window()
+        self.show_widgets("stats")
+        self.statusBar().showMessage('')
+        self.stats_level.blockSignals(True)
+        self.stats_level.setCurrentIndex(self.leaders_level.currentIndex())
+        self.stats_level.blockSignals(False)
+        if self.stats_size.currentText() != self.sort_by_difficulty.currentText():
+            self.stats_size.setCurrentText(self.sort_by_difficulty.currentText())
+        else:
+            self.stats_update()
+
+    def category(self, size_choice, level_choice):
+        """Категория рейтинга (rows, cols, номер уровня) из пары списков.
+        У размеров без уровней есть только LEVELS[0], и список уровней
+        выключается (вызывается после show_widgets, который его включает)"""
+        rows, cols = parse_size(size_choice.currentText())
+        levels = rows == cols and has_levels(rows)
+        if not levels and level_choice.currentIndex() != 0:
+            level_choice.blockSignals(True)
+            level_choice.setCurrentIndex(0)
+            level_choice.blockSignals(False)
+        level_choice.setEnabled(levels)
+        return rows, cols, level_choice.currentIndex()
+
+    def stats_update(self):
+        """Всё берётся из сводных таблиц и индекса (см. leaderboard.py),
+        поэтому не зависит от числа результатов"""
+        rows, cols, level = self.category(self.stats_size, self.stats_level)
+        points = self.leaderboard.percentiles(rows, cols, level=level)
+        if points[50] is None:
+            self.stats_summary.setText('В данной категории пока нет результатов')
+        else:
+            self.stats_summary.setText('   '.join(f'p{point}: {format_time(seconds)}'
+                                                for point, seconds in points.items()))
+        self.stats_histogram.set_data(bucket_labels(HISTOGRAM_EDGES),
+                                      self.leaderboard.histogram(rows, cols, level))
+        self.players_model.set_players(self.leaderboard.player_stats(rows, cols, level=level))
+
+    def field_generation(self, seed=None):
+        """Позиция выбранного уровня берётся из заранее подготовленного запаса
+        (см. difficulty.py), после чего поле перерисовывается один раз.
+        Зерно генератора сохраняется, чтобы ту же партию можно было повторить
+        через field_generation(seed)"""
+        if seed is None:
+            self.seed, self.puzzle, self.played_level = self.scramble_pool.take(self.n, self.level)
+        else:
+            self.seed = seed
+            self.played_level = played_level(self.n, self.level)
+            self.puzzle = generate(self.n, self.played_level, Random(seed))
+        # ходы партии записываются для повтора и проверки результата
+        self.recording = Recording(self.puzzle, self.seed)
+        if self.board is not None:
+            self.board.set_puzzle(self.puzzle)
+
+    def place_tile(self, tile, index):
+        """Перерисовка клеток после того, как кирпичик tile переехал в клетку index"""
+        self.board.tile_moved(tile, index)
 
     def move_check(self, key):
-        """Проверка корректности хода игрока"""
-        x, y = self.start_pos  # позиция без кирпичика
-        if key == Qt.Key_Down:
-            if y != 0:  # проверка, чтобы не выйти за края матриц и виджета,
-                # такие попытки будут игнорироваться
-
-                # меняем местами значения в матрицах
-                self.cords_mtx[x][y], self.cords_mtx[x][y - 1] = \
-                    self.cords_mtx[x][y - 1], self.cords_mtx[x][y]
-                self.window_widgets["game"][x][y], \
-                self.window_widgets["game"][x][y - 1] = \
-                    self.window_widgets["game"][x][y - 1], \
-                    self.window_widgets["game"][x][y]
-
-                # поэтому меняем и позицию без кирпичика
-                self.start_pos = (x, y - 1)
-                self.window_widgets["game"][x][y].move(5 + x *
-                                                       (SIZE // self.n + 5),
-                                                       5 + y *
-                                                       (SIZE // self.n + 5))
-
-        # с другими кнопками всё тоже самое, только направления другие
-        if key == Qt.Key_Up:
-            if y != self.n - 1:
-                self.cords_mtx[x][y], self.cords_mtx[x][y + 1] = \
-                    self.cords_mtx[x][y + 1], self.cords_mtx[x][y]
-                self.window_widgets["game"][x][y], \
-                self.window_widgets["game"][x][y + 1] = \
-                    self.window_widgets["game"][x][y + 1], \
-                    self.window_widgets["game"][x][y]
-                self.start_pos = (x, y + 1)
-                self.window_widgets["game"][x][y].move(5 + x *
-                                                       (SIZE // self.n + 5),
-                                                       5 + y *
-                                                       (SIZE // self.n + 5))
-        if key == Qt.Key_Right:
-            if x != 0:
-                self.cords_mtx[x][y], self.cords_mtx[x - 1][y] = \
-                    self.cords_mtx[x - 1][y], self.cords_mtx[x][y]
-                self.window_widgets["game"][x][y], \
-                self.window_widgets["game"][x - 1][y] = \
-                    self.window_widgets["game"][x - 1][y], \
-                    self.window_widgets["game"][x][y]
-                self.start_pos = (x - 1, y)
-                self.window_widgets["game"][x][y].move(5 + x *
-                                                       (SIZE // self.n + 5),
-                                                       5 + y *
-                                                       (SIZE // self.n + 5))
-        if key == Qt.Key_Left:
-            if x != self.n - 1:
-                self.cords_mtx[x][y], self.cords_mtx[x + 1][y] = \
-                    self.cords_mtx[x + 1][y], self.cords_mtx[x][y]
-                self.window_widgets["game"][x][y], \
-                self.window_widgets["game"][x + 1][y] = \
-                    self.window_widgets["game"][x + 1][y], \
-                    self.window_widgets["game"][x][y]
-                self.start_pos = (x + 1, y)
-                self.window_widgets["game"][x][y].move(5 + x *
-                                                       (SIZE // self.n + 5),
-                                                       5 + y *
-                                                       (SIZE // self.n + 5))
+        """Проверка корректности хода игрока. Возвращает True, если ход сделан"""
+        direction = KEY_TO_DIRECTION.get(key)
+        if direction is None:
+            return False
+        # ход выполняет движок, а на поле перерисовываются только две клетки
+        diff = self.puzzle.move(direction)
+        if diff is not None:
+            self.place_tile(*diff)
+            self.recording.append(direction)
+            if self.hint_path and self.hint_path[0] == direction:
+                # игрок пошёл по подсказке - остаток решения всё ещё оптимален
+                self.hint_path.pop(0)
+            else:
+                self.restart_hint()
+        return diff is not None
+
+    def hints_available(self):
+        """Проверка баз на диске выполняется один раз в начале партии (begin_game)"""
+        return self.hints_ready
+
+    def restart_hint(self):
+        """Остановка текущего поиска подсказки и запуск нового для текущей позиции.
+        На больших полях поиск начинается, только если игрок ждёт подсказку"""
+        self.cancel_hint()
+        if self.puzzle is None or self.puzzle.is_solved() or not self.hints_available():
+            return
+        if self.n > HINT_MAX_SIDE and not self.hint_wanted:
+            return
+        self.hint_generation += 1
+        self.hint_worker = HintWorker(self.puzzle, self.hint_generation,
+                                      PATTERN_HINT_BUDGET if self.n > HINT_MAX_SIDE else None)
+        self.hint_worker.signals.found.connect(self.hint_found)
+        self.hint_worker.signals.timed_out.connect(self.hint_timed_out)
+        QThreadPool.globalInstance().start(self.hint_worker)
+
+    def cancel_hint(self):
+        self.hint_path = None
+        if self.hint_worker is not None:
+            self.hint_worker.cancel()
+            self.hint_worker = None
+
+    def hint_found(self, generation, path):
+        """Приём результата фонового поиска"""
+        if generation != self.hint_generation or self.puzzle is None:
+            return
+        self.hint_worker = None
+        self.hint_path = path
+        if self.hint_wanted:
+            self.show_hint()
+
+    def hint_timed_out(self, generation):
+        """Поиск не уложился в PATTERN_HINT_BUDGET: игрок узнаёт об этом сразу"""
+        if generation != self.hint_generation or self.puzzle is None:
+            return
+        self.hint_worker = None
+        self.hint_wanted = False
+        self.statusBar().showMessage(f'Подсказка: за {PATTERN_HINT_BUDGET} с лучший ход не найден, '
+                                     'сделайте пару ходов и попробуйте снова')
+
+    def show_hint(self):
+        """Вывод следующего хода оптимального решения в строку состояния"""
+        if not self.hints_available():
+            if self.n == PATTERN_HINT_SIDE:
+                self.statusBar().showMessage('Подсказки для 4 x 4 появятся после сборки баз: '
+                                             'python pattern_db.py build')
+            else:
+                self.statusBar().showMessage('Подсказки доступны для полей до '
+                                             f'{HINT_MAX_SIDE} x {HINT_MAX_SIDE}')
+        elif self.hint_path is None:
+            if self.n > HINT_MAX_SIDE:
+                self.statusBar().showMessage(f'Подсказка: думаю (не дольше {PATTERN_HINT_BUDGET} с)...')
+            else:
+                self.statusBar().showMessage('Подсказка: ищем лучший ход...')
+            if not self.hint_wanted:
+                self.hint_wanted = True
+                if self.hint_worker is None:
+                    self.restart_hint()
+        elif self.hint_path:
+            self.hint_wanted = False
+            self.statusBar().showMessage(f'Подсказка: {ARROWS[self.hint_path[0]]} '
+                                         f'(до победы ходов: {len(self.hint_path)})')
 
     def read_the_database(self):
-        """Синхронизация базы данных лидеров с таблицей лидеров в самом приложении"""
-        difficulties = {'2 x 2': 1, '3 x 3': 2, '4 x 4': 3}
-        con = sqlite3.connect('data/leaderboard.db')
-        cur = con.cursor()
-        self.leaders = cur.execute(f"""
-        SELECT * FROM leaders
-            WHERE field_size = '{self.sort_by_difficulty.currentText()}'
-        """).fetchall()
-        con.close()
-        for _ in range(len(self.leaders) - 1):
-            for i in range(len(self.leaders) - 1):
-                if difficulties[self.leaders[i][2]] > \
-                        difficulties[self.leaders[i + 1][2]]:
-                    self.leaders[i], self.leaders[i + 1] = self.leaders[i + 1], \
-                                                           self.leaders[i]
-                # Если вдруг в таблице встречаются два рекорда на одинаковой сложности
-                # и с одинаковым отрезком времени с точностью до 0.001 секунды,
-                # то правильно будет поставить на позицию выше самый новый результат,
-                # так как в этом случае его данные будет актуальнее.
-                # Поэтому ставим знак ">=":
-                elif float(self.leaders[i][3]) >= float(self.leaders[i + 1][3]) and \
-                        difficulties[self.leaders[i][2]] == \
-                        difficulties[self.leaders[i + 1][2]]:
-                    self.leaders[i], self.leaders[i + 1] = self.leaders[i + 1], \
-                                                           self.leaders[i]
+        """Синхронизация базы данных лидеров с таблицей лидеров в самом приложении.
+        Сортировка и отбор выполняются в SQLite по индексу, а модель читает
+        рейтинг страницами по мере прокрутки"""
+        rows, cols, level = self.category(self.sort_by_difficulty, self.leaders_level)
+        # результат только что сыгранной партии мог ещё не дойти до базы:
+        # тогда таблица перечитается в results_written
+        self.leaders_model.set_category(rows, cols, level)
+
+    def results_written(self):
+        """Фоновая запись результатов закончилась: открытые таблица лидеров
+        и статистика перечитываются (до этого в них прежний снимок базы)"""
+        if "leader_board" in self.built and self.sort_by_difficulty.isVisibleTo(self):
+            self.tbl_update()
+        if "stats" in self.built and self.stats_size.isVisibleTo(self):
+            self.stats_update()
 
     def tbl_update(self):
         """Обновление данных таблицы лидеров, при постановлении нового рекорда игрока"""
-
-        def set_row_color(_row, color):
-            """Изменение цвета ячейки, находящейся в таблице лидеров"""
-            for i in range(self.leader_board.columnCount()):
-                self.leader_board.item(_row, i).setBackground(color)
-
         self.read_the_database()
-        self.leader_board.setColumnCount(3)
-        self.leader_board.setHorizontalHeaderLabels([
-            'name', 'field_size', 'time'
-        ])
-        self.leader_board.setRowCount(0)
-        top = set()
-        for row in range(len(self.leaders)):
-            self.leader_board.setRowCount(self.leader_board.rowCount() + 1)
-            for col in range(len(self.leaders[row]) - 1):
-                if isinstance(self.leaders[row][col + 1], float):
-                    win_time_console = self.leaders[row][col + 1]
-                    win_time = [(int(win_time_console // 3600), 'ч.'),
-                                (int(win_time_console // 60 % 60), 'мин.'),
-                                ("%.3f" % (win_time_console % 60), 'сек.')]
-                    elem = ''.join(list(map(
-                        lambda x: f'{x[0]} {x[1]} '
-                        if x[0] else '', win_time)))
-                    elem = QTableWidgetItem(str(elem))
-                else:
-                    elem = QTableWidgetItem(str(self.leaders[row][col + 1]))
-                elem.setFlags(Qt.ItemIsEnabled)
-                self.leader_board.setItem(
-                    row, col, elem)
-            clr = QColor(255, 255, 255)
-            if len(top) <= 3:
-                top.add(row)
-                if len(top) == 1:
-                    clr = QColor(255, 215, 0)
-                elif len(top) == 2:
-                    clr = QColor(151, 153, 151)
-                elif len(top) == 3:
-                    clr = QColor(150, 75, 0)
-            set_row_color(self.leader_board.rowCount() - 1, clr)
-        if self.leader_board.rowCount() == 0:
+        if self.leaders_model.rowCount() == 0:
             self.exp.setText('В данной категории пока нет никаних \nрезультатов. '
                              'Будь первым!')
         else:
@@ -612,26 +866,16 @@ class MainWindow(QMainWindow):
                 self.change_difficulty(obj)
             elif obj.id == LEADER_BOARD_BTN_ID:
                 self.leader_board_show()
+            elif obj.id == STATS_BTN_ID:
+                self.stats_show()
             elif obj.id == GO_TO_MAIN_MENU_BTN_ID:
+                self.cancel_loading()
                 self.clear_window()
                 self.statusBar().showMessage(VERSION)
                 self.show_widgets("main_menu")
             elif obj.id == DARK_MODE_BTN_ID:
                 self.dark_mode = not self.dark_mode
-                self.clear_window()
-                self.window_widgets = {
-                    "main_menu": [],
-                    "game": [],
-                    "settings": [],
-                    "leader_board": [],
-                    "tips": []}
-                self.init_ui()
-                if self.dark_mode:
-                    self.setStyleSheet(open('css/_styles.CSS').read())
-                else:
-                    self.setStyleSheet(open('css/styles.CSS').read())
-                self.clear_window()
-                self.show_widgets("settings")
+                self.apply_theme()
             return True
         return False
 
@@ -640,23 +884,30 @@ class MainWindow(QMainWindow):
          реализовано управление стрелочками"""
         key_event = QKeyEvent(event)
         key = key_event.key()
-        if not self.in_progress:
-            self.move_check(key)
-            if win_check(self.cords_mtx):
+        started = self.latency.begin() if self.latency is not None else 0
+        if key == Qt.Key_F3 and self.board is not None:
+            self.toggle_latency()
+            return
+        if not self.in_progress and self.auto_path is None:
+            if key == Qt.Key_H:
+                self.show_hint()
+                return
+            if key == Qt.Key_S:
+                self.auto_solve()
+                return
+            self.statusBar().showMessage('')
+            if self.move_check(key) and self.latency is not None:
+                self.latency.moved(started)
+            if self.puzzle.is_solved():
                 self.in_progress = True
+                self.cancel_hint()
                 # определяем время сборки и делаем его читабельным
                 win_time_console = round(time.time() - self.start_time, 3)
-                win_time = [(int(win_time_console // 3600), 'ч.'),
-                            (int(win_time_console // 60 % 60), 'мин.'),
-                            ("%.3f" % (win_time_console % 60), 'сек.')]
-                win_time = ''.join(list(map(
-                    lambda x: f'{x[0]} {x[1]} '
-                    if x[0] else '', win_time)))
-
-                result = self.cur.execute(
-                    f"""SELECT * FROM leaders
-                    WHERE field_size = '{self.difficulty}'""").fetchall()
-                data = list(map(lambda x: str(x[1]), result))
+                win_time = format_time(win_time_console)
+
+                rows, cols = parse_size(self.difficulty)
+                level = LEVELS.index(self.played_level)
+                data = self.leaderboard.names(rows, cols, level=level)
                 info = ('Победа', f'Ваш результат: {win_time}'
                                   f' Введите ваш ник:',
                         data, 1, True)
@@ -665,25 +916,84 @@ class MainWindow(QMainWindow):
                 # вносим данные в файл с некоторыми поправками
                 if not name or name.isspace():
                     # желательно, чтобы ник был из читабельных символов:
-                    name = 'UnnamedPlayer'
+                    name = UNNAMED
                 if ok_pressed:
-                    if name not in data:
-                        self.cur.execute(f"""
-                                    INSERT INTO leaders(name,field_size,time)
-                                    VALUES('{name}','{self.difficulty}',
-                                    {win_time_console})""")
-                    else:
-                        self.cur.execute(f"""UPDATE leaders
-                                    SET time = {win_time_console} WHERE time >
-                                    {win_time_console} and name = '{name}' 
-                                    and field_size = '{self.difficulty}'""")
-                    self.con.commit()
-                self.clear_window()
-                self.window_widgets["game"] = []
-                self.cords_mtx = []
-                self.show_widgets("main_menu")
-                self.statusBar().showMessage(VERSION)
-                self.setFixedSize(SIZE, SIZE)
+                    # новый игрок добавляется, у известного время обновляется,
+                    # только если стало лучше. Запись идёт в фоновом потоке
+                    self.leaderboard.record(name, rows, cols, win_time_console,
+                                            self.recording.pack(), level)
+                    if self.uploader is not None:
+                        self.uploader.submit(name, rows, cols, win_time_console, level)
+                self.end_game()
+
+    def toggle_latency(self):
+        """F3 во время игры: замер задержки ходов и панель с ним. Пока замер
+        выключен, на каждое нажатие и кадр тратится одна проверка на None"""
+        if self.latency is None:
+            self.latency = LatencyStats()
+            self.latency_hud = LatencyHud(self, self.latency)
+            self.board.on_painted = self.latency.painted
+            self.window_widgets["game"].append(self.latency_hud)
+            self.latency_hud.show()
+        else:
+            self.board.on_painted = None
+            self.window_widgets["game"].remove(self.latency_hud)
+            self.latency_hud.deleteLater()
+            self.latency = self.latency_hud = None
+
+    def end_game(self):
+        """Возврат из игры в главное меню"""
+        self.in_progress = True
+        self.cancel_hint()
+        self.auto_timer.stop()
+        self.auto_path = None
+        self.clear_window()
+        self.window_widgets["game"] = []
+        if self.board is not None:
+            self.board.deleteLater()
+            self.board = None
+        self.puzzle = None
+        self.show_widgets("main_menu")
+        self.statusBar().showMessage(VERSION)
+        if self.latency is not None and self.latency.handler:
+            self.statusBar().showMessage(f'Замеры задержки сохранены: {self.latency.export()}')
+        self.setFixedSize(SIZE, SIZE)
+
+    def auto_solve(self):
+        """Автоматическая сборка поля: готовое кратчайшее решение из подсказки,
+        иначе быстрое решение по строкам (row_solver.py), которое проигрывается
+        на поле по одному ходу за тик таймера"""
+        path = self.hint_path if self.hint_path else row_solver.solve(self.puzzle)
+        self.cancel_hint()
+        self.auto_path = deque(path)
+        self.statusBar().showMessage(f'Автосборка: ходов {len(path)}')
+        # длинные решения ускоряются, чтобы показ занимал не больше AUTO_SOLVE_DURATION
+        self.auto_timer.start(max(1, min(AUTO_SOLVE_INTERVAL,
+                                         AUTO_SOLVE_DURATION // max(1, len(path)))))
+
+    def auto_solve_step(self):
+        """Один ход автосборки"""
+        if self.puzzle is None:
+            self.auto_timer.stop()
+            return
+        if self.auto_path:
+            diff = self.puzzle.move(self.auto_path.popleft())
+            if diff is not None:
+                self.place_tile(*diff)
+        if not self.auto_path:
+            # собранное автоматически поле в таблицу лидеров не попадает
+            self.auto_timer.stop()
+            self.statusBar().showMessage('Собрано автоматически')
+            QTimer.singleShot(AUTO_SOLVE_DELAY, self.end_game)
+
+    def closeEvent(self, event):
+        """Остановка фонового поиска, чтобы пул потоков не задерживал выход,
+        и запись оставшихся в очереди результатов"""
+        self.cancel_hint()
+        self.leaderboard.close()
+        if self.uploader is not None:
+            self.uploader.close()
+        super().closeEvent(event)
 
     def change_difficulty(self, btn):
         """Смена уровня сложности игры (размера поля)"""
@@ -693,8 +1003,41 @@ class MainWindow(QMainWindow):
             self.difficulty = "3 x 3"
         elif btn.id == HARD_BTN_ID:
             self.difficulty = "4 x 4"
+        # без сигнала currentTextChanged, иначе change_size вызывается дважды
+        self.size_choice.blockSignals(True)
+        self.size_choice.setCurrentText(self.difficulty)
+        self.size_choice.blockSignals(False)
+        self.change_size(self.difficulty)
+
+    def change_size(self, difficulty):
+        """Смена размера поля (в том числе из списка всех размеров)"""
+        self.difficulty = difficulty
         self.number_of_bricks = self.num_of_br[self.difficulty]
-        self.statusBar().showMessage(f'Размер поля: {self.difficulty}')
+        self.scramble_pool.prefill(int(self.number_of_bricks ** 0.5), self.level)
+        self.update_level_choice()
+
+    def update_level_choice(self):
+        """Уровни есть не у всех размеров (см. difficulty.BANDS): для остальных
+        список сложности выключается (show() в tools.py включает его снова)"""
+        levels = has_levels(int(self.number_of_bricks ** 0.5))
+        if "settings" in self.built:
+            self.level_choice.setEnabled(levels)
+        if levels:
+            self.statusBar().showMessage(f'Размер поля: {self.difficulty}')
+        else:
+            self.statusBar().showMessage(f'Размер поля: {self.difficulty}, '
+                                         'сложность для него не выбирается')
+
+    def change_level(self, level):
+        """Смена уровня сложности перемешивания (длины решения)"""
+        self.level = level
+        self.scramble_pool.prefill(int(self.number_of_bricks ** 0.5), self.level)
+        n = int(self.number_of_bricks ** 0.5)
+        if has_levels(n) and n > EXACT_MAX_SIDE:
+            # на 4 x 4 уровень проверяется по оценке длины решения снизу
+            self.statusBar().showMessage(f'Сложность: {self.level} (не проще указанной)')
+        else:
+            self.statusBar().showMessage(f'Сложность: {self.level}')
 
     def dialog(self):
         """Сам диалог с пользователем о выборе картинки,
@@ -0,0 +1,132 @@
+import time
+
+from PyQt5.QtCore import QRect, Qt, QTimer
+from PyQt5.QtGui import QColor, QFont, QPainter, QPixmap
+from PyQt5.QtWidgets import QComboBox, QLabel, QPushButton, QSlider, QWidget
+
+from classes.assets import cached_pixmap
+from classes.board import Board, GAP
+from replay import Keyframes, unpack
+from tools import SIZE
+
+# Скорости воспроизведения (ходов в секунду)
+SPEEDS = (1, 5, 20, 100, 500)
+# Поле перерисовывается не чаще раза в FRAME_INTERVAL мс, а при быстром
+# воспроизведении за кадр делается несколько ходов
+FRAME_INTERVAL = 16
+CONTROLS_HEIGHT = SIZE // 15
+
+
+def numbered_pixmap(n):
+    """Картинка с номерами кирпичиков: у записи партии своей картинки нет.
+    Для каждого размера поля рисуется один раз"""
+    return cached_pixmap(f'numbered@{n}', lambda: _draw_numbers(n))
+
+
+def _draw_numbers(n):
+    pixmap = QPixmap(SIZE, SIZE)
+    pixmap.fill(QColor('#d4d4d4'))
+    side = SIZE // n
+    painter = QPainter(pixmap)
+    painter.setFont(QFont('Clickuper', max(8, side // 3), QFont.Bold))
+    for tile in range(n * n - 1):
+        row, col = divmod(tile, n)
+        painter.drawText(QRect(col * side, row * side, side, side), Qt.AlignCenter, str(tile + 1))
+    painter.end()
+    return pixmap
+
+
+class ReplayView(QWidget):
+    """Окно просмотра записанной партии с тем же полем (Board), что и в игре.
+    Перемотка берёт ближайший снимок из replay.Keyframes"""
+
+    def __init__(self, recording, title=''):
+        super().__init__()
+        puzzle, _, moves = unpack(recording)
+        self.keyframes = Keyframes(puzzle, moves)
+        self.position = 0
+        self.puzzle = puzzle.copy()
+        self.speed = SPEEDS[2]
+        self.played = 0.0
+        self.last_tick = 0.0
+
+        self.setWindowTitle(f'Повтор партии {title}')
+        self.board = Board(self, numbered_pixmap(puzzle.n), self.puzzle)
+        board_side = self.board.width()
+        self.setFixedSize(board_side, board_side + CONTROLS_HEIGHT)
+
+        top = board_side + GAP
+        height = CONTROLS_HEIGHT - 2 * GAP
+        self.play_button = QPushButton('▶', self)
+        self.play_button.setGeometry(GAP, top, height * 2, height)
+        self.play_button.clicked.connect(self.toggle)
+
+        self.speed_choice = QComboBox(self)
+        self.speed_choice.addItems([f'{speed} ход/с' for speed in SPEEDS])
+        self.speed_choice.setCurrentIndex(SPEEDS.index(self.speed))
+        self.speed_choice.setGeometry(2 * GAP + height * 2, top, SIZE // 7, height)
+        self.speed_choice.currentIndexChanged.connect(self.change_speed)
+
+        self.slider = QSlider(Qt.Horizontal, self)
+        self.slider.setRange(0, len(self.keyframes))
+        left = 3 * GAP + height * 2 + SIZE // 7
+        self.slider.setGeometry(left, top, board_side - left - SIZE // 5, height)
+        self.slider.valueChanged.connect(self.seek)
+
+        self.counter = QLabel(self)
+        self.counter.setAlignment(Qt.AlignVCenter | Qt.AlignRight)
+        self.counter.setGeometry(board_side - SIZE // 5, top, SIZE // 5 - GAP, height)
+        self.show_position()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(FRAME_INTERVAL)
+        self.timer.timeout.connect(self.tick)
+
+    def toggle(self):
+        if self.timer.isActive():
+            self.timer.stop()
+            self.play_button.setText('▶')
+            return
+        if self.position == len(self.keyframes):
+            self.seek(0)
+        self.played = 0.0
+        self.last_tick = time.perf_counter()
+        self.timer.start()
+        self.play_button.setText('❚❚')
+
+    def change_speed(self, index):
+        self.speed = SPEEDS[index]
+
+    def tick(self):
+        """Ходы, которые должны были пройти с прошлого кадра при текущей скорости"""
+        now = time.perf_counter()
+        self.played += (now - self.last_tick) * self.speed
+        self.last_tick = now
+        moves = self.keyframes.moves
+        while self.played >= 1 and self.position < len(moves):
+            tile, index = self.puzzle.move(moves[self.position])
+            self.board.tile_moved(tile, index)
+            self.position += 1
+            self.played -= 1
+        self.show_position()
+        if self.position == len(moves):
+            self.toggle()
+
+    def seek(self, index):
+        """Переход к позиции после index ходов (и от ползунка, и из кода)"""
+        if index == self.position:
+            return
+        self.position = index
+        self.puzzle = self.keyframes.at(index)
+        self.board.set_puzzle(self.puzzle)
+        self.show_position()
+
+    def show_position(self):
+        self.counter.setText(f'{self.position} / {len(self.keyframes)}')
+        self.slider.blockSignals(True)
+        self.slider.setValue(self.position)
+        self.slider.blockSignals(False)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+from PyQt5.QtGui import QColor
+
+from classes import assets
+from tools import SIZE
+
+# Светлая (False) и тёмная (True) темы: общая таблица стилей, стрелка
+# возврата в меню, цвет теней кнопок и заголовков и стили отдельных виджетов
+THEMES = {
+    False: {
+        'stylesheet': 'css/styles.css',
+        'arrow': 'icons/arrow.ico',
+        'shadow': 'black',
+        'bar': '#4d4d4d',
+        'text': 'black',
+        'reference': """
+                                color: black;
+                                border: 1px solid black;
+                                border-radius: 5px;
+                                background: #d4d4d4;
+                """,
+        'combo': """
+                background-color:  white;
+                QComboBox::down-arrow
+                                         {
+                                         border : 2px solid black;
+                                         border-width : 5px 1px 10px 3px;
+                                         };
+            border:                 none;
+             """},
+    True: {
+        'stylesheet': 'css/_styles.css',
+        'arrow': 'icons/_arrow.ico',
+        'shadow': 'gray',
+        'bar': '#cfcfcf',
+        'text': '#cfcfcf',
+        'reference': """
+                                color: black;
+                                border: 1px solid white;
+                                border-radius: 5px;
+                                background: gray;
+                """,
+        'combo': """
+                        background-color:  #cfcfcf;
+                        QComboBox::down-arrow
+                                                 {
+                                                 border : 2px solid black;
+                                                 border-width : 5px 1px 10px 3px;
+                                                 color: #cfcfcf
+                                                 };
+                    border:                 none;
+                     """}}
+
+
+class Theme:
+    """Тема, подготовленная один раз: таблица стилей и картинки стрелки
+    берутся из assets, цвета созданы. При смене темы виджеты только получают
+    эти объекты"""
+
+    def __init__(self, dark):
+        settings = THEMES[dark]
+        self.stylesheet = assets.text(settings['stylesheet'])
+        self.shadow = QColor(settings['shadow'])
+        self.bar = QColor(settings['bar'])
+        self.text = QColor(settings['text'])
+        self.reference = settings['reference']
+        self.combo = settings['combo']
+        self.arrow = assets.pixmap(settings['arrow'], SIZE // 20)
+        self.big_arrow = assets.pixmap(settings['arrow'], int(SIZE // 20 * 1.25))
+
+
+@lru_cache(maxsize=None)
+def theme_for(dark):
+    """Тема строится при первом обращении (нужен уже созданный QApplication)"""
+    return Theme(dark)
@@ -1,7 +1,7 @@
 from PyQt5.QtWidgets import QLabel
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor
 
+from classes.theme import theme_for
 from tools import SIZE, COOL_FONT, shadowEffect
 
 
@@ -29,5 +29,4 @@ class SubTitle(QLabel):
         self.setAlignment(Qt.AlignVCenter | Qt.AlignHCenter)
         self.setFont(COOL_FONT)
         self.setStyleSheet(f'''font-size: {SIZE // 25}pt;''')
-        color = QColor('gray' if args[1].dark_mode else 'black')
-        shadowEffect(self, color)
+        shadowEffect(self, theme_for(args[1].dark_mode).shadow)
@@ -0,0 +1 @@
+# Корень проекта попадает в sys.path, и тесты импортируют модули игры как есть
@@ -0,0 +1,155 @@
+"""Генерация позиций с длиной решения в заданных пределах"""
+import threading
+from collections import deque
+from random import Random, getrandbits
+
+from engine import Puzzle, scramble, neighbours, OPPOSITE
+from solver import estimator_for
+
+# Уровни сложности: пределы длины кратчайшего решения для каждого размера поля.
+# None - равномерно случайная позиция, как раньше. Для 4 x 4 с пределами
+# сравнивается оценка снизу (эвристика решателя), а настоящее решение может
+# быть длиннее, так что там уровень - нижняя граница сложности. Для полей
+# больше 4 x 4 уровней нет: позиция всегда равномерно случайная
+LEVELS = ('Любая', 'Лёгкая', 'Средняя', 'Сложная')
+BANDS = {
+    2: {'Лёгкая': (1, 2), 'Средняя': (3, 4), 'Сложная': (5, 6)},
+    3: {'Лёгкая': (8, 14), 'Средняя': (15, 21), 'Сложная': (22, 31)},
+    4: {'Лёгкая': (15, 25), 'Средняя': (26, 40), 'Сложная': (41, 80)},
+}
+# Поля до этого размера имеют полную таблицу расстояний, для больших
+# длина решения оценивается снизу эвристикой решателя
+EXACT_MAX_SIDE = 3
+POOL_SIZE = 8
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def distance_table(n):
+    """Точные расстояния до собранной позиции для всех позиций поля n x n
+    (поиск в ширину, 181440 позиций для 3 x 3)"""
+    with _tables_lock:
+        table = _tables.get(n)
+        if table is None:
+            goal = Puzzle(n)
+            table = {goal.tiles.tobytes(): 0}
+            frontier = [goal]
+            while frontier:
+                following = []
+                for puzzle in frontier:
+                    depth = table[puzzle.tiles.tobytes()] + 1
+                    for direction in puzzle.legal_moves():
+                        moved = puzzle.copy()
+                        moved.move(direction)
+                        key = moved.tiles.tobytes()
+                        if key not in table:
+                            table[key] = depth
+                            following.append(moved)
+                frontier = following
+            _tables[n] = table
+    return table
+
+
+def distance(puzzle):
+    """Длина кратчайшего решения (точная для маленьких полей, иначе оценка снизу)"""
+    if puzzle.n <= EXACT_MAX_SIDE:
+        return distance_table(puzzle.n)[puzzle.tiles.tobytes()]
+    return estimator_for(list(puzzle.tiles), puzzle.n).h
+
+
+def has_levels(n):
+    return n in BANDS
+
+
+def ready(n):
+    """Можно ли сразу сгенерировать позицию уровня: таблица расстояний
+    либо не нужна, либо уже построена"""
+    return n > EXACT_MAX_SIDE or n in _tables
+
+
+def band(n, level):
+    """Пределы длины решения для уровня level или None для любой позиции"""
+    return BANDS.get(n, {}).get(level)
+
+
+def played_level(n, level):
+    """Уровень, которому на самом деле соответствует позиция generate(n, level):
+    без пределов для этого размера позиция равномерно случайная (LEVELS[0])"""
+    return level if band(n, level) is not None else LEVELS[0]
+
+
+def generate(n, level, rng=None):
+    """Позиция поля n x n заданного уровня. Кандидаты получаются случайным
+    блужданием без возвратов (равномерные позиции почти все сложные),
+    а неподходящие по длине решения отбрасываются"""
+    if rng is None:
+        rng = Random()
+    limits = band(n, level)
+    if limits is None:
+        return scramble(n, rng)
+    low, high = limits
+    table = neighbours(n)
+    while True:
+        puzzle = Puzzle(n)
+        previous = None
+        for _ in range(rng.randint(low, 2 * high)):
+            direction = rng.choice([direction for direction, _ in table[puzzle.blank]
+                                    if previous is None or direction != OPPOSITE[previous]])
+            puzzle.move(direction)
+            previous = direction
+        if low <= distance(puzzle) <= high:
+            return puzzle
+
+
+class ScramblePool:
+    """Запас заранее сгенерированных позиций для каждой пары (размер, уровень).
+    Запас пополняет фоновый поток, поэтому в начале игры позиция берётся мгновенно"""
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.pools = {}
+        self.wanted = deque()
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def prefill(self, n, level):
+        """Попросить фоновый поток подготовить позиции для (n, level)"""
+        with self.condition:
+            self.pools.setdefault((n, level), deque())
+            if (n, level) not in self.wanted:
+                self.wanted.append((n, level))
+            self.condition.notify()
+
+    def take(self, n, level):
+        """Тройка (зерно, позиция, уровень): из запаса, если он есть, иначе
+        генерируется сразу. Пока таблица расстояний строится в фоне (около 1.5 с
+        для 3 x 3), вызывающий поток не ждёт её, а получает равномерно случайную
+        позицию с уровнем LEVELS[0] - такой результат не попадёт в рейтинг
+        выбранного уровня. В любом случае generate(n, уровень, Random(зерно))
+        повторяет позицию"""
+        with self.condition:
+            pool = self.pools.get((n, level))
+            item = pool.popleft() if pool else None
+        self.prefill(n, level)
+        if item is not None:
+            return item + (played_level(n, level),)
+        seed = getrandbits(32)
+        if ready(n):
+            return seed, generate(n, level, Random(seed)), played_level(n, level)
+        return seed, scramble(n, Random(seed)), LEVELS[0]
+
+    def _fill(self):
+        while True:
+            with self.condition:
+                while not self.wanted:
+                    self.condition.wait()
+                key = self.wanted[0]
+                if len(self.pools[key]) >= self.size:
+                    self.wanted.popleft()
+                    continue
+            seed = getrandbits(32)
+            item = seed, generate(*key, Random(seed))
+            with self.condition:
+                self.pools[key].append(item)
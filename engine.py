@@ -0,0 +1,178 @@
+"""Игровая логика пятнашек без зависимости от PyQt"""
+import random
+from array import array
+
+# Направления ходов совпадают со стрелочками: кирпичик едет в сторону нажатой
+# стрелки, а пустая клетка - в противоположную.
+UP = 0
+DOWN = 1
+LEFT = 2
+RIGHT = 3
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+OPPOSITE = (DOWN, UP, RIGHT, LEFT)
+
+_neighbours_cache = {}
+_targets_cache = {}
+
+
+def neighbours(n):
+    """Таблица ходов для поля n x n: для каждой позиции пустой клетки
+    кортеж пар (направление, индекс кирпичика, который поедет в пустую клетку)"""
+    table = _neighbours_cache.get(n)
+    if table is None:
+        table = []
+        for index in range(n * n):
+            row, col = divmod(index, n)
+            moves = []
+            if row != n - 1:
+                moves.append((UP, index + n))
+            if row != 0:
+                moves.append((DOWN, index - n))
+            if col != n - 1:
+                moves.append((LEFT, index + 1))
+            if col != 0:
+                moves.append((RIGHT, index - 1))
+            table.append(tuple(moves))
+        table = _neighbours_cache[n] = tuple(table)
+    return table
+
+
+def targets(n):
+    """Таблица переходов: targets(n)[blank][direction] - новый индекс пустой клетки
+    или -1, если ход невозможен"""
+    table = _targets_cache.get(n)
+    if table is None:
+        table = []
+        for moves in neighbours(n):
+            row = [-1] * 4
+            for direction, index in moves:
+                row[direction] = index
+            table.append(tuple(row))
+        table = _targets_cache[n] = tuple(table)
+    return table
+
+
+class Puzzle:
+    """Состояние поля: плоский массив n * n, где в клетке index лежит номер
+    кирпичика, то есть индекс его правильной позиции. Пустая клетка имеет номер
+    n * n - 1, в собранном положении она в правом нижнем углу."""
+
+    __slots__ = ('n', 'size', 'tiles', 'blank', 'in_place', '_targets')
+
+    def __init__(self, n, tiles=None):
+        self.n = n
+        self.size = n * n
+        typecode = 'B' if self.size <= 256 else 'H'
+        if tiles is None:
+            tiles = range(self.size)
+        self.tiles = array(typecode, tiles)
+        if sorted(self.tiles) != list(range(self.size)):
+            raise ValueError('tiles must be a permutation of range(n * n)')
+        self.blank = self.tiles.index(self.size - 1)
+        self.in_place = sum(1 for index, tile in enumerate(self.tiles) if index == tile)
+        self._targets = targets(n)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """Создание поля из матрицы координат вида matrix[x][y] = (x0, y0),
+        которую раньше хранило окно игры (cords_mtx)"""
+        n = len(matrix)
+        tiles = [0] * (n * n)
+        for x in range(n):
+            for y in range(n):
+                x0, y0 = matrix[x][y]
+                tiles[y * n + x] = y0 * n + x0
+        return cls(n, tiles)
+
+    def to_matrix(self):
+        """Обратное преобразование в матрицу координат matrix[x][y] = (x0, y0)"""
+        n = self.n
+        return [[tuple(reversed(divmod(self.tiles[y * n + x], n))) for y in range(n)]
+                for x in range(n)]
+
+    def copy(self):
+        other = Puzzle.__new__(Puzzle)
+        other.n = self.n
+        other.size = self.size
+        other.tiles = array(self.tiles.typecode, self.tiles)
+        other.blank = self.blank
+        other.in_place = self.in_place
+        other._targets = self._targets
+        return other
+
+    def legal_moves(self):
+        """Возможные ходы из текущей позиции"""
+        return tuple(direction for direction, _ in neighbours(self.n)[self.blank])
+
+    def can_move(self, direction):
+        return self._targets[self.blank][direction] != -1
+
+    def move(self, direction):
+        """Выполнение хода. Возвращает пару (кирпичик, новый индекс клетки) -
+        всё, что нужно для перерисовки, либо None, если ход невозможен"""
+        blank = self.blank
+        index = self._targets[blank][direction]
+        if index == -1:
+            return None
+        tiles = self.tiles
+        tile = tiles[index]
+        # Счётчик кирпичиков на своих местах меняется только в двух клетках
+        self.in_place += (tile == blank) - (tile == index) \
+            + (self.size - 1 == index) - (self.size - 1 == blank)
+        tiles[blank] = tile
+        tiles[index] = self.size - 1
+        self.blank = index
+        return tile, blank
+
+    def is_solved(self):
+        return self.in_place == self.size
+
+    def __eq__(self, other):
+        return isinstance(other, Puzzle) and self.tiles == other.tiles
+
+    def __repr__(self):
+        return f'Puzzle({self.n}, {self.tiles.tolist()})'
+
+
+def parity(tiles):
+    """Чётность перестановки через разложение на циклы, O(n)"""
+    seen = bytearray(len(tiles))
+    cycles = 0
+    for start in range(len(tiles)):
+        if not seen[start]:
+            cycles += 1
+            index = start
+            while not seen[index]:
+                seen[index] = 1
+                index = tiles[index]
+    return (len(tiles) - cycles) % 2
+
+
+def is_solvable(tiles, n):
+    """Позиция собирается, если чётность перестановки совпадает с чётностью
+    манхэттенского расстояния пустой клетки до правого нижнего угла"""
+    blank = list(tiles).index(n * n - 1)
+    row, col = divmod(blank, n)
+    return parity(tiles) == (2 * n - 2 - row - col) % 2
+
+
+def scramble(n, rng=None):
+    """Равномерно случайная собираемая (и не собранная) позиция за O(n * n).
+    Перестановка перемешивается целиком, а если она не собирается, меняются
+    местами два первых кирпичика (не пустая клетка), что взаимно однозначно
+    переводит несобираемые позиции в собираемые и сохраняет равномерность."""
+    if n < 2:
+        raise ValueError('board must be at least 2 x 2')
+    if rng is None:
+        rng = random.Random()
+    size = n * n
+    while True:
+        tiles = list(range(size))
+        rng.shuffle(tiles)
+        if not is_solvable(tiles, n):
+            # среди трёх первых клеток хотя бы две заняты кирпичиками
+            first, second = [index for index in range(3) if tiles[index] != size - 1][:2]
+            tiles[first], tiles[second] = tiles[second], tiles[first]
+        puzzle = Puzzle(n, tiles)
+        if not puzzle.is_solved():
+            return puzzle
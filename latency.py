@@ -0,0 +1,78 @@
+"""Замер задержки хода: от нажатия клавиши до конца перерисовки поля.
+Без включённого замера игра делает только проверку на None."""
+import json
+import os
+import time
+from array import array
+from collections import deque
+
+# Скорость ходов считается по последним MOVES_WINDOW секундам
+MOVES_WINDOW = 1.0
+LATENCY_DIR = 'data/latency'
+
+
+def percentile(values, point):
+    """Ближайший ранг по уже отсортированным values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, -(-point * len(values) // 100) - 1))]
+
+
+class LatencyStats:
+    """Замеры одной партии (мс): задержка нажатие -> кадр, время обработки
+    нажатия и время отрисовки кадра"""
+
+    def __init__(self):
+        self.latency = array('d')
+        self.handler = array('d')
+        self.frames = array('d')
+        self.recent = deque()
+        self.pending = None
+
+    def reset(self):
+        self.__init__()
+
+    @staticmethod
+    def begin():
+        return time.perf_counter()
+
+    def moved(self, started):
+        """Нажатие started обработано и кирпичик сдвинут: ждём кадр"""
+        now = time.perf_counter()
+        self.handler.append((now - started) * 1000)
+        if self.pending is None:
+            self.pending = started
+        self.recent.append(now)
+        while self.recent[0] < now - MOVES_WINDOW:
+            self.recent.popleft()
+
+    def painted(self, paint_started):
+        """Конец отрисовки поля"""
+        now = time.perf_counter()
+        self.frames.append((now - paint_started) * 1000)
+        if self.pending is not None:
+            self.latency.append((now - self.pending) * 1000)
+            self.pending = None
+
+    def moves_per_second(self):
+        border = time.perf_counter() - MOVES_WINDOW
+        while self.recent and self.recent[0] < border:
+            self.recent.popleft()
+        return len(self.recent) / MOVES_WINDOW
+
+    def summary(self):
+        result = {'moves': len(self.handler), 'moves_per_second': self.moves_per_second()}
+        for name in ('latency', 'handler', 'frames'):
+            values = sorted(getattr(self, name))
+            result[name] = {f'p{point}': percentile(values, point) for point in (50, 95, 99)}
+            result[name]['max'] = values[-1] if values else 0.0
+        return result
+
+    def export(self, directory=LATENCY_DIR):
+        """Сохранение итогов и всех замеров партии в JSON. Возвращает путь"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S') + '.json')
+        with open(path, 'w', encoding='utf8') as file:
+            json.dump({'summary': self.summary(), 'latency_ms': list(self.latency),
+                       'handler_ms': list(self.handler), 'frame_ms': list(self.frames)}, file)
+        return path
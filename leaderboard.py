@@ -0,0 +1,745 @@
+"""Таблица лидеров в SQLite: схема, её миграции и запросы.
+
+Замер открытия таблицы на большой базе:
+python leaderboard.py bench [--rows 1000000]
+
+Выгрузка и объединение таблиц с разных компьютеров (у игрока остаётся
+лучшее время в каждой категории):
+python leaderboard.py export leaders.csv|leaders.jsonl
+python leaderboard.py import kiosk1.csv kiosk2.jsonl kiosk3/leaderboard.db"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import replay
+
+SCHEMA_VERSION = 5
+# Сколько лучших результатов категории показывается в таблице лидеров
+TOP_LIMIT = 100
+UNNAMED = 'UnnamedPlayer'
+# Уровень сложности хранится номером в difficulty.LEVELS. Уровень 0 ('Любая') -
+# равномерно случайная позиция; с ним же остаются результаты до версии 5
+ANY_LEVEL = 0
+# Попыток записать пачку результатов (база может быть занята другим
+# процессом); пауза между ними растёт вдвое от WRITE_RETRY_DELAY (с)
+WRITE_ATTEMPTS = 3
+WRITE_RETRY_DELAY = 0.5
+
+log = logging.getLogger(__name__)
+
+_CREATE_V2 = (
+    '''CREATE TABLE IF NOT EXISTS leaders (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+        name       TEXT    NOT NULL,
+        rows       INTEGER NOT NULL,
+        cols       INTEGER NOT NULL,
+        time       REAL    NOT NULL,
+        created_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now')))''',
+    # рейтинг категории читается прямо из индекса: при равном времени выше новый результат
+    'CREATE INDEX IF NOT EXISTS leaders_size_time ON leaders (rows, cols, time, id DESC)',
+    # у игрока один (лучший) результат на каждый размер поля
+    'CREATE UNIQUE INDEX IF NOT EXISTS leaders_player ON leaders (rows, cols, name)',
+)
+
+# Границы корзин гистограммы лучших времён (с): корзина 0 - быстрее первой
+# границы, последняя - не быстрее последней
+HISTOGRAM_EDGES = (5, 10, 20, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+def _bucket(column):
+    """SQL-выражение номера корзины для времени column"""
+    return ' + '.join(f'({column} >= {edge})' for edge in HISTOGRAM_EDGES)
+
+
+# Версия 3: сводные таблицы для экрана статистики. Гистограмма ведётся
+# триггерами при любом изменении leaders (в том числе при импорте), а число
+# и суммарное время партий игрока - при записи каждой партии (см. RECORD_GAME)
+_CREATE_V3 = (
+    '''CREATE TABLE IF NOT EXISTS histogram (
+        rows   INTEGER NOT NULL,
+        cols   INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        count  INTEGER NOT NULL,
+        PRIMARY KEY (rows, cols, bucket)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS players (
+        rows       INTEGER NOT NULL,
+        cols       INTEGER NOT NULL,
+        name       TEXT    NOT NULL,
+        games      INTEGER NOT NULL,
+        total_time REAL    NOT NULL,
+        PRIMARY KEY (rows, cols, name)) WITHOUT ROWID''',
+    # гистограмма пересчитывается заново, поэтому шаг можно повторить
+    'DELETE FROM histogram',
+    f'''INSERT INTO histogram (rows, cols, bucket, count)
+        SELECT rows, cols, {_bucket('time')}, COUNT(*) FROM leaders GROUP BY 1, 2, 3''',
+    # уже сохранённый лучший результат считается одной партией
+    '''INSERT OR IGNORE INTO players (rows, cols, name, games, total_time)
+        SELECT rows, cols, name, 1, time FROM leaders''',
+    f'''CREATE TRIGGER IF NOT EXISTS leaders_histogram_insert AFTER INSERT ON leaders BEGIN
+        INSERT INTO histogram (rows, cols, bucket, count)
+            VALUES (NEW.rows, NEW.cols, {_bucket('NEW.time')}, 1)
+            ON CONFLICT (rows, cols, bucket) DO UPDATE SET count = count + 1;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS leaders_histogram_update AFTER UPDATE OF time ON leaders BEGIN
+        UPDATE histogram SET count = count - 1
+            WHERE rows = OLD.rows AND cols = OLD.cols AND bucket = {_bucket('OLD.time')};
+        INSERT INTO histogram (rows, cols, bucket, count)
+            VALUES (NEW.rows, NEW.cols, {_bucket('NEW.time')}, 1)
+            ON CONFLICT (rows, cols, bucket) DO UPDATE SET count = count + 1;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS leaders_histogram_delete AFTER DELETE ON leaders BEGIN
+        UPDATE histogram SET count = count - 1
+            WHERE rows = OLD.rows AND cols = OLD.cols AND bucket = {_bucket('OLD.time')};
+    END''',
+)
+
+# Версия 4: запись каждой партии (см. replay.py). В leaders хранится ссылка
+# на партию, которой поставлен лучший результат (столбец replay_id, см. _migrate_v4)
+_CREATE_V4 = (
+    '''CREATE TABLE IF NOT EXISTS replays (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+        name       TEXT    NOT NULL,
+        rows       INTEGER NOT NULL,
+        cols       INTEGER NOT NULL,
+        time       REAL    NOT NULL,
+        moves      INTEGER NOT NULL,
+        replay     BLOB    NOT NULL,
+        created_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now')))''',
+)
+
+
+# Версия 5: у каждого результата свой уровень сложности, и рейтинг, гистограмма
+# и статистика игроков ведутся отдельно для каждого уровня (см. _migrate_v5)
+_CREATE_V5 = (
+    'DROP INDEX IF EXISTS leaders_size_time',
+    'DROP INDEX IF EXISTS leaders_player',
+    'CREATE INDEX leaders_size_time ON leaders (rows, cols, level, time, id DESC)',
+    'CREATE UNIQUE INDEX leaders_player ON leaders (rows, cols, level, name)',
+    'DROP TRIGGER IF EXISTS leaders_histogram_insert',
+    'DROP TRIGGER IF EXISTS leaders_histogram_update',
+    'DROP TRIGGER IF EXISTS leaders_histogram_delete',
+    'DROP TABLE IF EXISTS histogram',
+    '''CREATE TABLE histogram (
+        rows   INTEGER NOT NULL,
+        cols   INTEGER NOT NULL,
+        level  INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        count  INTEGER NOT NULL,
+        PRIMARY KEY (rows, cols, level, bucket)) WITHOUT ROWID''',
+    f'''INSERT INTO histogram (rows, cols, level, bucket, count)
+        SELECT rows, cols, level, {_bucket('time')}, COUNT(*) FROM leaders GROUP BY 1, 2, 3, 4''',
+    f'''CREATE TRIGGER leaders_histogram_insert AFTER INSERT ON leaders BEGIN
+        INSERT INTO histogram (rows, cols, level, bucket, count)
+            VALUES (NEW.rows, NEW.cols, NEW.level, {_bucket('NEW.time')}, 1)
+            ON CONFLICT (rows, cols, level, bucket) DO UPDATE SET count = count + 1;
+    END''',
+    f'''CREATE TRIGGER leaders_histogram_update AFTER UPDATE OF time ON leaders BEGIN
+        UPDATE histogram SET count = count - 1
+            WHERE rows = OLD.rows AND cols = OLD.cols AND level = OLD.level
+                AND bucket = {_bucket('OLD.time')};
+        INSERT INTO histogram (rows, cols, level, bucket, count)
+            VALUES (NEW.rows, NEW.cols, NEW.level, {_bucket('NEW.time')}, 1)
+            ON CONFLICT (rows, cols, level, bucket) DO UPDATE SET count = count + 1;
+    END''',
+    f'''CREATE TRIGGER leaders_histogram_delete AFTER DELETE ON leaders BEGIN
+        UPDATE histogram SET count = count - 1
+            WHERE rows = OLD.rows AND cols = OLD.cols AND level = OLD.level
+                AND bucket = {_bucket('OLD.time')};
+    END''',
+    '''CREATE TABLE players_v5 (
+        rows       INTEGER NOT NULL,
+        cols       INTEGER NOT NULL,
+        level      INTEGER NOT NULL,
+        name       TEXT    NOT NULL,
+        games      INTEGER NOT NULL,
+        total_time REAL    NOT NULL,
+        PRIMARY KEY (rows, cols, level, name)) WITHOUT ROWID''',
+    f'''INSERT INTO players_v5 (rows, cols, level, name, games, total_time)
+        SELECT rows, cols, {ANY_LEVEL}, name, games, total_time FROM players''',
+    'DROP TABLE players',
+    'ALTER TABLE players_v5 RENAME TO players',
+)
+
+
+def parse_size(field_size):
+    """'4 x 4' -> (4, 4)"""
+    rows, cols = field_size.split(' x ')
+    return int(rows), int(cols)
+
+
+def format_size(rows, cols):
+    return f'{rows} x {cols}'
+
+
+def _columns(con, table):
+    return {row[1] for row in con.execute(f'PRAGMA table_info({table})')}
+
+
+def _tables(con):
+    return {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+# Строки таблицы версии 1 в новых столбцах (name, rows, cols, time)
+_V1_LEADERS = f'''
+    SELECT COALESCE(name, '{UNNAMED}'),
+           CAST(substr(field_size, 1, instr(field_size, ' x ') - 1) AS INTEGER),
+           CAST(substr(field_size, instr(field_size, ' x ') + 3) AS INTEGER),
+           MIN(CAST(time AS REAL))
+    FROM {{table}}
+    WHERE instr(field_size, ' x ') > 0
+    GROUP BY 1, 2, 3'''
+
+
+def _migrate_v2(con):
+    """Версия 1 (до появления версий): field_size STRING вида '4 x 4' и время
+    без типа. Повторы игрока в категории сводятся к лучшему времени.
+    Таблица leaders_v1 остаётся только от миграции, прерванной прошлой версией
+    модуля, и может быть уже в новой схеме - тогда строки просто переносятся"""
+    tables = _tables(con)
+    if 'leaders' in tables and 'field_size' in _columns(con, 'leaders'):
+        con.execute('ALTER TABLE leaders RENAME TO leaders_v1')
+        tables.add('leaders_v1')
+    if 'leaders_v1' in tables:
+        # индексы и триггеры переименованной таблицы уехали вместе с ней,
+        # и их имена нужны новой leaders
+        for kind, name in con.execute("SELECT type, name FROM sqlite_master WHERE tbl_name = "
+                                      "'leaders_v1' AND type IN ('index', 'trigger') "
+                                      "AND sql IS NOT NULL").fetchall():
+            con.execute(f'DROP {kind.upper()} {name}')
+    for statement in _CREATE_V2:
+        con.execute(statement)
+    if 'leaders_v1' not in tables:
+        return
+    if 'field_size' in _columns(con, 'leaders_v1'):
+        con.execute('INSERT OR IGNORE INTO leaders (name, rows, cols, time)'
+                    + _V1_LEADERS.format(table='leaders_v1'))
+    else:
+        con.execute('''
+            INSERT OR IGNORE INTO leaders (name, rows, cols, time, created_at)
+            SELECT name, rows, cols, time, created_at FROM leaders_v1''')
+    con.execute('DROP TABLE leaders_v1')
+
+
+def _migrate_v3(con):
+    for statement in _CREATE_V3:
+        con.execute(statement)
+
+
+def _migrate_v4(con):
+    for statement in _CREATE_V4:
+        con.execute(statement)
+    # у ALTER TABLE ADD COLUMN нет IF NOT EXISTS
+    if 'replay_id' not in _columns(con, 'leaders'):
+        con.execute('ALTER TABLE leaders ADD COLUMN replay_id INTEGER REFERENCES replays (id)')
+
+
+def _migrate_v5(con):
+    """Шаг целиком идёт в транзакции migrate(), поэтому IF NOT EXISTS не нужен"""
+    con.execute(f'ALTER TABLE leaders ADD COLUMN level INTEGER NOT NULL DEFAULT {ANY_LEVEL}')
+    for statement in _CREATE_V5:
+        con.execute(statement)
+
+
+# Шаги миграции: (версия после шага, шаг)
+_MIGRATIONS = ((2, _migrate_v2), (3, _migrate_v3), (4, _migrate_v4), (5, _migrate_v5))
+
+
+def migrate(con):
+    """Приведение базы к текущей схеме. Версия хранится в PRAGMA user_version.
+    Каждый шаг вместе с новой версией выполняется в одной явной транзакции:
+    модуль sqlite3 сам выполняет CREATE/ALTER вне транзакции, и сбой посреди
+    шага оставил бы таблицы без записанной версии. Кроме того, все шаги
+    можно повторить на базе, которую так оставила прошлая версия модуля"""
+    if con.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+        return
+    isolation_level = con.isolation_level
+    con.isolation_level = None
+    try:
+        for version, step in _MIGRATIONS:
+            # версия читается под блокировкой: базу мог обновить другой процесс
+            con.execute('BEGIN IMMEDIATE')
+            try:
+                if con.execute('PRAGMA user_version').fetchone()[0] < version:
+                    step(con)
+                    con.execute(f'PRAGMA user_version = {version}')
+                con.execute('COMMIT')
+            except BaseException:
+                con.execute('ROLLBACK')
+                raise
+    finally:
+        con.isolation_level = isolation_level
+
+
+def connect(path):
+    con = sqlite3.connect(path)
+    # WAL: чтение не ждёт записи, а запись не требует fsync всей базы
+    con.execute('PRAGMA journal_mode = WAL')
+    con.execute('PRAGMA synchronous = NORMAL')
+    migrate(con)
+    return con
+
+
+def connect_read_only(path):
+    """Соединение только для чтения: база не мигрирует и не переводится в WAL"""
+    return sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True)
+
+
+# Категория рейтинга - размер поля и уровень сложности (level, см. ANY_LEVEL)
+def top(con, rows, cols, limit=TOP_LIMIT, level=ANY_LEVEL):
+    """Лучшие результаты категории в виде (id, name, field_size, time)"""
+    return con.execute('''
+        SELECT id, name, rows || ' x ' || cols, time FROM leaders
+        WHERE rows = ? AND cols = ? AND level = ?
+        ORDER BY time, id DESC
+        LIMIT ?''', (rows, cols, level, limit)).fetchall()
+
+
+def page(con, rows, cols, after=None, limit=TOP_LIMIT, level=ANY_LEVEL):
+    """Следующая страница рейтинга категории после строки after = (time, id)
+    предыдущей страницы. Продолжение ищется по индексу, а не через OFFSET,
+    поэтому любая страница читается одинаково быстро"""
+    if after is None:
+        return top(con, rows, cols, limit, level)
+    time_, id_ = after
+    return con.execute('''
+        SELECT id, name, rows || ' x ' || cols, time FROM leaders
+        WHERE rows = ? AND cols = ? AND level = ? AND (time > ? OR time = ? AND id < ?)
+        ORDER BY time, id DESC
+        LIMIT ?''', (rows, cols, level, time_, time_, id_, limit)).fetchall()
+
+
+def histogram(con, rows, cols, level=ANY_LEVEL):
+    """Число игроков категории в каждой корзине HISTOGRAM_EDGES"""
+    counts = [0] * (len(HISTOGRAM_EDGES) + 1)
+    for bucket, count in con.execute('SELECT bucket, count FROM histogram '
+                                     'WHERE rows = ? AND cols = ? AND level = ?',
+                                     (rows, cols, level)):
+        counts[bucket] = count
+    return counts
+
+
+def percentiles(con, rows, cols, points=(50, 90, 99), level=ANY_LEVEL):
+    """Точные процентили лучших времён категории {p: время или None}.
+    Гистограмма говорит, в какой корзине лежит нужное место, и индекс
+    пролистывается только внутри этой корзины"""
+    counts = histogram(con, rows, cols, level)
+    total = sum(counts)
+    result = {}
+    for point in points:
+        if not total:
+            result[point] = None
+            continue
+        # ближайший ранг: место ceil(p * N / 100), считая с единицы
+        rank = max(0, -(-point * total // 100) - 1)
+        bucket, below = 0, 0
+        while below + counts[bucket] <= rank:
+            below += counts[bucket]
+            bucket += 1
+        lower = HISTOGRAM_EDGES[bucket - 1] if bucket else 0
+        result[point] = con.execute('''
+            SELECT time FROM leaders WHERE rows = ? AND cols = ? AND level = ? AND time >= ?
+            ORDER BY time LIMIT 1 OFFSET ?''',
+            (rows, cols, level, lower, rank - below)).fetchone()[0]
+    return result
+
+
+def player_stats(con, rows, cols, limit=TOP_LIMIT, level=ANY_LEVEL):
+    """Лучшие игроки категории: (name, лучшее время, партий, среднее время).
+    Для результатов, попавших в базу импортом, число партий неизвестно
+    (None), и среднее тоже None"""
+    return con.execute('''
+        SELECT leaders.name, leaders.time, players.games, players.total_time / players.games
+        FROM leaders LEFT JOIN players USING (rows, cols, level, name)
+        WHERE leaders.rows = ? AND leaders.cols = ? AND leaders.level = ?
+        ORDER BY leaders.time, leaders.id DESC
+        LIMIT ?''', (rows, cols, level, limit)).fetchall()
+
+
+def recording_of(con, leader_id):
+    """Запись партии, которой поставлен результат leader_id, или None"""
+    row = con.execute('''
+        SELECT replays.replay FROM leaders JOIN replays ON replays.id = leaders.replay_id
+        WHERE leaders.id = ?''', (leader_id,)).fetchone()
+    return row and row[0]
+
+
+def names(con, rows, cols, limit=TOP_LIMIT, level=ANY_LEVEL):
+    """Имена игроков категории (лучшие сначала) для подсказки в диалоге победы"""
+    return [name for name, in con.execute('''
+        SELECT name FROM leaders WHERE rows = ? AND cols = ? AND level = ?
+        ORDER BY time LIMIT ?''', (rows, cols, level, limit))]
+
+
+# Параметры: (name, rows, cols, time, level)
+RECORD = '''
+    INSERT INTO leaders (name, rows, cols, time, level) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (rows, cols, level, name) DO UPDATE
+        SET time = excluded.time, created_at = excluded.created_at
+        WHERE excluded.time < leaders.time'''
+# Учёт каждой сыгранной партии, даже если рекорд не побит
+RECORD_GAME = '''
+    INSERT INTO players (name, rows, cols, total_time, level, games) VALUES (?, ?, ?, ?, ?, 1)
+    ON CONFLICT (rows, cols, level, name) DO UPDATE
+        SET games = games + 1, total_time = total_time + excluded.total_time'''
+
+
+RECORD_REPLAY = '''
+    INSERT INTO replays (name, rows, cols, time, moves, replay) VALUES (?, ?, ?, ?, ?, ?)'''
+# Партия становится партией рекорда, если её время теперь лучшее
+LINK_REPLAY = '''
+    UPDATE leaders SET replay_id = ?
+    WHERE rows = ? AND cols = ? AND level = ? AND name = ? AND time = ?'''
+
+
+def _write_results(con, results):
+    """results: (name, rows, cols, seconds, recording, level) - recording из
+    replay.Recording.pack() или None. Вызывается внутри транзакции"""
+    scores = [(name, rows, cols, seconds, level)
+              for name, rows, cols, seconds, _, level in results]
+    con.executemany(RECORD, scores)
+    con.executemany(RECORD_GAME, scores)
+    for name, rows, cols, seconds, recording, level in results:
+        if recording is None:
+            continue
+        replay_id = con.execute(RECORD_REPLAY, (name, rows, cols, seconds,
+                                                replay.move_count(recording), recording)).lastrowid
+        con.execute(LINK_REPLAY, (replay_id, rows, cols, level, name, seconds))
+
+
+def record(con, name, rows, cols, seconds, recording=None, level=ANY_LEVEL):
+    """Запись результата: новый игрок добавляется, у известного время
+    обновляется, только если стало лучше. Запись партии сохраняется всегда"""
+    with con:
+        _write_results(con, [(name, rows, cols, seconds, recording, level)])
+
+
+# Объединение: из двух результатов игрока в категории остаётся лучший
+MERGE = '''
+    INSERT INTO leaders (name, rows, cols, time, created_at, level) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (rows, cols, level, name) DO UPDATE
+        SET time = excluded.time, created_at = excluded.created_at
+        WHERE excluded.time < leaders.time'''
+# Выгрузки без level (до версии 5) загружаются с ANY_LEVEL
+FIELDS = ('name', 'rows', 'cols', 'time', 'created_at', 'level')
+# Выгрузка только в текстовые форматы, загрузка ещё и из другой базы
+TEXT_FORMATS = ('csv', 'jsonl')
+IMPORT_FORMATS = TEXT_FORMATS + ('db',)
+# Строк в одной транзакции при загрузке
+IMPORT_BATCH = 100000
+
+
+def _format(file_name, formats=IMPORT_FORMATS):
+    extension = os.path.splitext(file_name)[1].lower()[1:]
+    if extension not in formats:
+        raise ValueError(f'unsupported file format: {file_name} (expected {", ".join(formats)})')
+    return extension
+
+
+def export(con, file_name):
+    """Выгрузка всей таблицы в CSV или JSON Lines. Строки идут из курсора
+    по одной, поэтому память не зависит от размера таблицы"""
+    # формат проверяется до открытия, иначе файл был бы уже создан или обрезан
+    file_format = _format(file_name, TEXT_FORMATS)
+    cursor = con.execute(f'SELECT {", ".join(FIELDS)} FROM leaders ORDER BY rows, cols, level, time')
+    count = 0
+    with open(file_name, 'w', newline='', encoding='utf8') as file:
+        if file_format == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(FIELDS)
+            for row in cursor:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in cursor:
+                file.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n')
+                count += 1
+    return count
+
+
+def read_rows(file_name):
+    """Строки (name, rows, cols, time, created_at, level) из CSV или JSON Lines по одной"""
+    file_format = _format(file_name, TEXT_FORMATS)
+    with open(file_name, newline='', encoding='utf8') as file:
+        if file_format == 'csv':
+            records = csv.DictReader(file)
+        else:
+            records = (json.loads(line) for line in file if line.strip())
+        for item in records:
+            yield (item['name'] or UNNAMED, int(item['rows']), int(item['cols']),
+                   float(item['time']), int(item.get('created_at') or time.time()),
+                   int(item.get('level') or ANY_LEVEL))
+
+
+def merge(con, rows, batch=IMPORT_BATCH):
+    """Загрузка строк пачками по batch в отдельных транзакциях"""
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, batch))
+        if not chunk:
+            return count
+        with con:
+            con.executemany(MERGE, chunk)
+        count += len(chunk)
+
+
+def read_database(file_name):
+    """Строки (name, rows, cols, time, created_at, level) из другой базы по одной.
+    База открывается только для чтения и не мигрирует: схема версии 1
+    (field_size) разбирается запросом, у более новых столбцы уже нужные,
+    а до версии 5 все результаты имеют уровень ANY_LEVEL"""
+    other = connect_read_only(file_name)
+    try:
+        columns = _columns(other, 'leaders')
+        if 'field_size' in columns:
+            now = int(time.time())
+            for row in other.execute(_V1_LEADERS.format(table='leaders')):
+                yield row + (now, ANY_LEVEL)
+        elif {'name', 'rows', 'cols', 'time', 'created_at'} <= columns:
+            level = 'level' if 'level' in columns else ANY_LEVEL
+            yield from other.execute(f'SELECT name, rows, cols, time, created_at, {level} FROM leaders')
+        else:
+            version = other.execute('PRAGMA user_version').fetchone()[0]
+            raise ValueError(f'{file_name}: no leaders table (schema version {version})')
+    finally:
+        other.close()
+
+
+def merge_database(con, file_name):
+    """Объединение с другой базой, сама она не изменяется"""
+    return merge(con, read_database(file_name))
+
+
+def import_files(con, file_names):
+    for file_name in file_names:
+        started = time.perf_counter()
+        if _format(file_name) == 'db':
+            count = merge_database(con, file_name)
+        else:
+            count = merge(con, read_rows(file_name))
+        seconds = time.perf_counter() - started
+        print(f'{file_name}: {count:,} строк за {seconds:.1f} с '
+              f'({count / max(seconds, 1e-9):,.0f} строк/с)')
+
+
+class Timer:
+    """Счётчик числа и времени операций одного вида"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.longest = max(self.longest, seconds)
+
+    def as_dict(self):
+        return {'count': self.count, 'total_ms': self.total * 1000,
+                'max_ms': self.longest * 1000,
+                'mean_ms': self.total * 1000 / self.count if self.count else 0.0}
+
+
+class LeaderboardService:
+    """Одно соединение для чтения на всё время работы игры и отдельный поток
+    записи с очередью: победа в игре только кладёт результат в очередь и не
+    ждёт диска. Все запросы параметризованы, поэтому sqlite3 держит их
+    подготовленными в своём кэше выражений. on_written вызывается из потока
+    записи, когда очередь опустела, - по нему окно перечитывает рейтинг"""
+
+    def __init__(self, path, on_written=None):
+        self.path = path
+        self.on_written = on_written
+        self.con = connect(path)
+        self.queries = Timer()
+        self.commits = Timer()
+        self.lost = 0
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+
+    def _query(self, function, *args):
+        started = time.perf_counter()
+        result = function(self.con, *args)
+        self.queries.add(time.perf_counter() - started)
+        return result
+
+    def top(self, rows, cols, limit=TOP_LIMIT, level=ANY_LEVEL):
+        return self._query(top, rows, cols, limit, level)
+
+    def page(self, rows, cols, after=None, limit=TOP_LIMIT, level=ANY_LEVEL):
+        return self._query(page, rows, cols, after, limit, level)
+
+    def names(self, rows, cols, limit=TOP_LIMIT, level=ANY_LEVEL):
+        return self._query(names, rows, cols, limit, level)
+
+    def recording_of(self, leader_id):
+        return self._query(recording_of, leader_id)
+
+    def histogram(self, rows, cols, level=ANY_LEVEL):
+        return self._query(histogram, rows, cols, level)
+
+    def percentiles(self, rows, cols, points=(50, 90, 99), level=ANY_LEVEL):
+        return self._query(percentiles, rows, cols, points, level)
+
+    def player_stats(self, rows, cols, limit=TOP_LIMIT, level=ANY_LEVEL):
+        return self._query(player_stats, rows, cols, limit, level)
+
+    def record(self, name, rows, cols, seconds, recording=None, level=ANY_LEVEL):
+        """Результат (и запись партии) сохраняется в фоне"""
+        self.queue.put((name, rows, cols, seconds, recording, level))
+
+    def flush(self):
+        """Ожидание записи всех результатов из очереди"""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+        self.con.close()
+
+    def stats(self):
+        return {'queries': self.queries.as_dict(), 'commits': self.commits.as_dict(),
+                'pending': self.queue.qsize(), 'lost': self.lost}
+
+    def _commit(self, con, results):
+        """Запись пачки одной транзакцией с повторами. Возвращает соединение:
+        после ошибки оно открывается заново"""
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                if con is None:
+                    con = sqlite3.connect(self.path)
+                    con.execute('PRAGMA synchronous = NORMAL')
+                started = time.perf_counter()
+                with con:
+                    _write_results(con, results)
+                self.commits.add(time.perf_counter() - started)
+                return con
+            except sqlite3.Error:
+                if con is not None:
+                    con.close()
+                    con = None
+                if attempt + 1 == WRITE_ATTEMPTS:
+                    self.lost += len(results)
+                    log.exception('результаты не записаны (%d)', len(results))
+                else:
+                    time.sleep(WRITE_RETRY_DELAY * 2 ** attempt)
+        return con
+
+    def _write(self):
+        con = None
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            try:
+                # всё, что накопилось в очереди, записывается одной транзакцией
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                results = [item for item in batch if item is not None]
+                running = len(results) == len(batch)
+                if results:
+                    con = self._commit(con, results)
+            finally:
+                # иначе flush() и close() ждали бы очередь вечно
+                for _ in batch:
+                    self.queue.task_done()
+            if results and self.on_written is not None and self.queue.empty():
+                self.on_written()
+        if con is not None:
+            con.close()
+
+
+def seed(con, count, sizes=(2, 3, 4, 5, 8, 10, 16), batch=50000):
+    """Заполнение базы случайными результатами (для замеров)"""
+    rng = random.Random(0)
+    with con:
+        for start in range(0, count, batch):
+            con.executemany('INSERT OR IGNORE INTO leaders (name, rows, cols, time) '
+                            'VALUES (?, ?, ?, ?)',
+                            ((f'player{index}', size, size, rng.uniform(1, 3600))
+                             for index in range(start, min(count, start + batch))
+                             for size in (rng.choice(sizes),)))
+
+
+def bench(count=1000000):
+    """Время открытия таблицы лидеров (запрос лучших TOP_LIMIT) на базе из count строк"""
+    with tempfile.TemporaryDirectory() as directory:
+        con = connect(os.path.join(directory, 'leaderboard.db'))
+        started = time.perf_counter()
+        seed(con, count)
+        print(f'База из {count:,} строк заполнена за {time.perf_counter() - started:.1f} с')
+        for rows in (2, 4, 16):
+            started = time.perf_counter()
+            result = top(con, rows, rows)
+            seconds = time.perf_counter() - started
+            print(f'  {format_size(rows, rows):>7}: {len(result)} лучших за {seconds * 1000:.2f} мс')
+        started = time.perf_counter()
+        result = percentiles(con, 4, 4)
+        seconds = time.perf_counter() - started
+        print(f'  процентили 4 x 4 {result} за {seconds * 1000:.2f} мс')
+        last = top(con, 16, 16, 1000)[-1]
+        started = time.perf_counter()
+        result = page(con, 16, 16, (last[3], last[0]))
+        seconds = time.perf_counter() - started
+        print(f'  страница после 1000-го места: {len(result)} строк за {seconds * 1000:.2f} мс')
+        plan = con.execute('EXPLAIN QUERY PLAN SELECT id FROM leaders WHERE rows = 4 AND cols = 4 '
+                           'ORDER BY time, id DESC LIMIT 100').fetchall()
+        print('  план запроса:', '; '.join(row[-1] for row in plan))
+        con.close()
+        service = LeaderboardService(os.path.join(directory, 'leaderboard.db'))
+        started = time.perf_counter()
+        for index in range(1000):
+            service.record(f'bench{index}', 4, 4, 1.0 + index)
+        queued = time.perf_counter() - started
+        service.flush()
+        commits = service.stats()['commits']
+        print(f'  1000 результатов в очередь за {queued * 1000:.2f} мс, '
+              f'записано {commits["count"]} транзакциями за {commits["total_ms"]:.1f} мс')
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Таблица лидеров')
+    parser.add_argument('command', choices=('bench', 'migrate', 'export', 'import'))
+    parser.add_argument('files', nargs='*', help='файл выгрузки или файлы для объединения')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--database', default='data/leaderboard.db')
+    args = parser.parse_args()
+    if args.command == 'bench':
+        bench(args.rows)
+        return
+    if args.command == 'export' and len(args.files) != 1:
+        parser.error('export needs exactly one output file')
+    try:
+        for file_name in args.files:
+            _format(file_name, TEXT_FORMATS if args.command == 'export' else IMPORT_FORMATS)
+    except ValueError as error:
+        parser.error(str(error))
+    con = connect(args.database)
+    if args.command == 'export':
+        started = time.perf_counter()
+        count = export(con, args.files[0])
+        seconds = time.perf_counter() - started
+        print(f'{args.files[0]}: {count:,} строк за {seconds:.1f} с '
+              f'({count / max(seconds, 1e-9):,.0f} строк/с)')
+    elif args.command == 'import':
+        import_files(con, args.files)
+    con.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,19 @@
 """Версия 1.1"""
+import argparse
+import os
 import sys
 
+from PyQt5.QtCore import QEvent
 from PyQt5.QtWidgets import QApplication
 
+from classes.hint import HintWorker
+from classes.image_loader import ImageLoader
 from classes.main_window import MainWindow
+from profiling import Tracer
+
+# Методы окна, которые попадают в трассу (см. profiling.py)
+TRACED = ('init_ui', 'start_game', 'begin_game', 'field_generation', 'tbl_update',
+          'read_the_database', 'stats_update', 'end_game')
 
 """
 В коде программы ниже представлены классы для различных обьектов,
@@ -16,13 +26,47 @@ def except_hook(cls, exception, traceback):
     sys.__excepthook__(cls, exception, traceback)
 
 
+def start_tracing(path, profile):
+    """Обёртки ставятся до создания окна, чтобы сигналы, подключённые
+    в __init__, тоже шли через них. Без файла трассы оборачивается только
+    профилируемый метод"""
+    tracer = Tracer(path, profile)
+    if path is None:
+        tracer.wrap(MainWindow, profile)
+        return tracer
+    tracer.wrap_methods(MainWindow, TRACED)
+    # из всех событий кнопок в трассу попадают только нажатия
+    tracer.wrap(MainWindow, 'eventFilter',
+                label=lambda window, obj, event: f'eventFilter[{getattr(obj, "id", "?")}]',
+                when=lambda window, obj, event: event.type() == QEvent.MouseButtonPress)
+    tracer.wrap(HintWorker, 'run', label=lambda worker: 'HintWorker.run')
+    tracer.wrap(ImageLoader, 'run', label=lambda loader: 'ImageLoader.run')
+    return tracer
+
+
 def main():
     """Непосредственно запуск приложения"""
+    parser = argparse.ArgumentParser(description='Пятнашки')
+    parser.add_argument('--trace', default=os.environ.get('TAG_TRACE') or None,
+                        help='сохранить трассу Chrome/Perfetto в этот файл при выходе')
+    parser.add_argument('--profile', default=os.environ.get('TAG_PROFILE') or None, choices=TRACED,
+                        help='снять cProfile с одного метода окна; без --trace профиль '
+                             'сохраняется в <метод>.prof')
+    # остальные аргументы достаются Qt
+    args, qt_args = parser.parse_known_args()
+    # значение по умолчанию (из TAG_PROFILE) argparse по choices не проверяет
+    if args.profile not in (None,) + TRACED:
+        parser.error(f'argument --profile: invalid choice: {args.profile!r} '
+                     f'(choose from {", ".join(TRACED)})')
     sys.excepthook = except_hook
-    app = QApplication(sys.argv)
+    tracer = start_tracing(args.trace, args.profile) if args.trace or args.profile else None
+    app = QApplication(sys.argv[:1] + qt_args)
     ex = MainWindow()
     ex.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    if tracer is not None:
+        tracer.save()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,179 @@
+"""Отправка результатов на общий сервер таблицы лидеров (см. server.py).
+
+Результат сначала записывается в очередь на диске (data/outbox.db) и только
+потом отправляется, поэтому без сети ничего не теряется: очередь уйдёт
+пачками, когда сервер станет доступен, в том числе при следующем запуске игры."""
+import http.client
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import leaderboard
+import server
+
+# Адрес сервера, например 'http://127.0.0.1:8765'. Без него игра ведёт
+# только локальную таблицу
+SERVER_URL = os.environ.get('TAG_LEADERBOARD_SERVER')
+# Результатов в одном запросе (не больше server.MAX_BATCH)
+BATCH = 500
+TIMEOUT = 10
+# Пауза перед повтором после ошибки растёт вдвое до MAX_BACKOFF (с)
+MIN_BACKOFF = 5
+MAX_BACKOFF = 300
+# Сколько закрытие игры ждёт поток отправки (с). Если он занят запросом,
+# результаты, которые он не успел забрать, сохраняет close()
+CLOSE_TIMEOUT = 0.5
+
+
+class ScoreUploader:
+    """Фоновый поток, который записывает результаты в очередь на диске и
+    переносит их оттуда на сервер. Соединение с сервером держится открытым
+    между отправками"""
+
+    def __init__(self, url, path):
+        self.url = urlsplit(url)
+        self.path = path
+        with sqlite3.connect(path) as con:
+            con.execute('PRAGMA journal_mode = WAL')
+            con.execute('''CREATE TABLE IF NOT EXISTS outbox (
+                id   INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+                name TEXT    NOT NULL,
+                rows INTEGER NOT NULL,
+                cols INTEGER NOT NULL,
+                time REAL    NOT NULL)''')
+            # очередь прошлых версий игры была без уровня сложности
+            if 'level' not in {row[1] for row in con.execute('PRAGMA table_info(outbox)')}:
+                con.execute(f'ALTER TABLE outbox ADD COLUMN level INTEGER NOT NULL '
+                            f'DEFAULT {leaderboard.ANY_LEVEL}')
+        con.close()
+        self.connection = None
+        self.condition = threading.Condition()
+        self.incoming = []
+        self.stopped = False
+        self.backoff = 0
+        self.sent = 0
+        self.failures = 0
+        self.rejected = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, name, rows, cols, seconds, level=leaderboard.ANY_LEVEL):
+        """Результат только передаётся потоку отправки: запись на диск и сеть
+        не задерживают игру. Результат, который сервер не примет, отбрасывается
+        сразу (см. server.check_score)"""
+        try:
+            score = server.check_score(name, rows, cols, seconds, level)
+        except (TypeError, ValueError):
+            self.rejected += 1
+            return
+        with self.condition:
+            self.incoming.append(score)
+            self.condition.notify()
+
+    def pending(self):
+        con = sqlite3.connect(self.path)
+        count = con.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+        con.close()
+        with self.condition:
+            return count + len(self.incoming)
+
+    def close(self):
+        """Неотправленное остаётся в очереди до следующего запуска"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join(CLOSE_TIMEOUT)
+        if self.thread.is_alive():
+            con = sqlite3.connect(self.path)
+            self._save(con)
+            con.close()
+
+    def _save(self, con):
+        """Перенос переданных потоку результатов в очередь на диске"""
+        with self.condition:
+            scores, self.incoming = self.incoming, []
+        if scores:
+            with con:
+                con.executemany('INSERT INTO outbox (name, rows, cols, time, level) '
+                                'VALUES (?, ?, ?, ?, ?)', scores)
+
+    def _connect(self):
+        if self.connection is None:
+            connection_class = (http.client.HTTPSConnection if self.url.scheme == 'https'
+                                else http.client.HTTPConnection)
+            self.connection = connection_class(self.url.hostname, self.url.port, timeout=TIMEOUT)
+        return self.connection
+
+    def _send(self, batch):
+        """False - сервер отказался принять пачку (ответ 400)"""
+        body = json.dumps({'scores': [{'name': name, 'rows': rows, 'cols': cols, 'time': seconds,
+                                       'level': level}
+                                      for _, name, rows, cols, seconds, level in batch]})
+        connection = self._connect()
+        try:
+            connection.request('POST', self.url.path.rstrip('/') + '/scores', body,
+                               {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # соединение могло оборваться: следующая попытка откроет новое
+            connection.close()
+            self.connection = None
+            raise
+        if response.status == 400:
+            return False
+        if response.status != 200:
+            raise OSError(f'server answered {response.status}')
+        return True
+
+    def _flush(self, con, backoff):
+        """Отправка всей очереди пачками. Возвращает паузу до следующей
+        попытки: 0 - очередь пуста, и ждать можно до нового результата"""
+        while not self.stopped:
+            batch = con.execute('SELECT id, name, rows, cols, time, level FROM outbox '
+                                'ORDER BY id LIMIT ?', (BATCH,)).fetchall()
+            if not batch:
+                return 0
+            try:
+                if self._send(batch):
+                    with con:
+                        con.execute('DELETE FROM outbox WHERE id <= ?', (batch[-1][0],))
+                    self.sent += len(batch)
+                    continue
+                # пачку отклонил хотя бы один результат: по одному уходят
+                # остальные, а отклонённые сервер не примет никогда
+                for row in batch:
+                    if self._send([row]):
+                        self.sent += 1
+                    else:
+                        self.rejected += 1
+                    with con:
+                        con.execute('DELETE FROM outbox WHERE id = ?', (row[0],))
+            except (OSError, http.client.HTTPException):
+                self.failures += 1
+                return min(MAX_BACKOFF, max(MIN_BACKOFF, backoff * 2))
+        return backoff
+
+    def _run(self):
+        con = sqlite3.connect(self.path)
+        # первая попытка сразу: в очереди могло остаться что-то с прошлого запуска
+        retry_at = 0
+        while True:
+            self._save(con)
+            if self.stopped:
+                break
+            if time.monotonic() >= retry_at:
+                self.backoff = self._flush(con, self.backoff)
+                retry_at = time.monotonic() + self.backoff
+            with self.condition:
+                # после ошибки новый результат только сохраняется на диск,
+                # а уйдёт вместе с остальными при следующей попытке
+                if not self.incoming and not self.stopped:
+                    self.condition.wait(max(0, retry_at - time.monotonic()) if self.backoff else None)
+        self._save(con)
+        if self.connection is not None:
+            self.connection.close()
+        con.close()
@@ -0,0 +1,254 @@
+"""Аддитивные базы шаблонов (pattern databases) для поиска решения 4 x 4.
+
+Сборка:    python pattern_db.py build [--partition 6-6-3] [--workers 3]
+Проверка:  python pattern_db.py verify [--partition 6-6-3]
+
+Для каждой группы кирпичиков хранится наименьшее число ходов именно этими
+кирпичиками, нужное для их расстановки. Ходы остальных кирпичиков не
+считаются, поэтому значения групп можно складывать. Индекс записи - номера
+клеток кирпичиков группы в системе счисления по основанию n * n, так что ход
+одного кирпичика меняет индекс за O(1). Файлы занимают по байту на запись и
+читаются через mmap только при первом обращении.
+
+С базами большинство позиций 4 x 4 решается быстрее секунды, но самые
+сложные на чистом Python - десятки секунд, поэтому игра ограничивает поиск
+подсказки по времени (PATTERN_HINT_BUDGET в classes/main_window.py)."""
+import argparse
+import json
+import mmap
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import Puzzle, scramble, neighbours
+
+DATA_DIR = 'data'
+UNKNOWN = 255
+
+# Разбиения кирпичиков 4 x 4 на группы (номер кирпичика - индекс его клетки,
+# пустая клетка 15 в правом нижнем углу)
+PARTITIONS = {
+    '6-6-3': ((0, 1, 4, 5, 8, 12), (2, 3, 6, 7, 10, 11), (9, 13, 14)),
+    '5-5-5': ((0, 1, 4, 5, 8), (2, 3, 6, 7, 11), (9, 10, 12, 13, 14)),
+}
+DEFAULT_PARTITION = '6-6-3'
+
+
+def file_name(n, pattern, directory=DATA_DIR):
+    return os.path.join(directory, f'pdb_{n}x{n}_{"-".join(map(str, pattern))}.bin')
+
+
+def meta_name(n, partition, directory=DATA_DIR):
+    return os.path.join(directory, f'pdb_{n}x{n}_{partition}.json')
+
+
+def _components(occupied, n, cache):
+    """Связные области свободных клеток (битовые маски) при занятых клетках occupied"""
+    result = cache.get(occupied)
+    if result is None:
+        result = []
+        free = ~occupied & ((1 << n * n) - 1)
+        table = neighbours(n)
+        while free:
+            start = (free & -free).bit_length() - 1
+            component, stack = 1 << start, [start]
+            while stack:
+                for _, index in table[stack.pop()]:
+                    bit = 1 << index
+                    if free & bit and not component & bit:
+                        component |= bit
+                        stack.append(index)
+            free &= ~component
+            result.append(component)
+        cache[occupied] = result
+    return result
+
+
+def _component_of(occupied, cell, n, cache):
+    for component in _components(occupied, n, cache):
+        if component >> cell & 1:
+            return component
+    return 0
+
+
+def build_pattern(n, pattern):
+    """Поиск в ширину от собранной позиции по состояниям (клетки кирпичиков
+    группы, область пустой клетки). Пустая клетка внутри своей области
+    перемещается бесплатно, ход кирпичика группы стоит 1."""
+    size = n * n
+    base = [size ** slot for slot in range(len(pattern))]
+    table = neighbours(n)
+    cache = {}
+    database = bytearray([UNKNOWN]) * size ** len(pattern)
+    # посещённые клетки пустой клетки (битовая маска) для каждой расстановки группы
+    typecode = 'H' if size <= 16 else 'Q'
+    visited = array(typecode, bytes(array(typecode).itemsize * len(database)))
+    positions = tuple(pattern)
+    occupied = sum(1 << cell for cell in positions)
+    start = _component_of(occupied, size - 1, n, cache)
+    index = sum(cell * base[slot] for slot, cell in enumerate(positions))
+    frontier = [(positions, index, start)]
+    visited[index] = start
+    database[index] = 0
+    depth = 0
+    while frontier:
+        depth += 1
+        following = []
+        for positions, index, component in frontier:
+            occupied = sum(1 << cell for cell in positions)
+            for slot, cell in enumerate(positions):
+                for _, target in table[cell]:
+                    if not component >> target & 1:
+                        continue
+                    # кирпичик группы уезжает в соседнюю пустую клетку
+                    moved = positions[:slot] + (target,) + positions[slot + 1:]
+                    moved_index = index + (target - cell) * base[slot]
+                    region = _component_of(occupied ^ (1 << cell) ^ (1 << target),
+                                           cell, n, cache)
+                    seen = visited[moved_index]
+                    if seen & region:
+                        continue
+                    visited[moved_index] = seen | region
+                    if database[moved_index] == UNKNOWN:
+                        database[moved_index] = depth
+                    following.append((moved, moved_index, region))
+        frontier = following
+    return bytes(database)
+
+
+def _build_job(job):
+    n, pattern, directory = job
+    started = time.perf_counter()
+    database = build_pattern(n, pattern)
+    name = file_name(n, pattern, directory)
+    with open(name, 'wb') as file:
+        file.write(database)
+    return pattern, time.perf_counter() - started, max(set(database) - {UNKNOWN})
+
+
+def build(n=4, partition=DEFAULT_PARTITION, workers=None, directory=DATA_DIR):
+    """Сборка всех баз разбиения в пуле процессов (по процессу на группу)"""
+    os.makedirs(directory, exist_ok=True)
+    patterns = PARTITIONS[partition]
+    started = time.perf_counter()
+    report = {'n': n, 'partition': partition, 'patterns': []}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [(n, pattern, directory) for pattern in patterns]
+        for pattern, seconds, depth in pool.map(_build_job, jobs):
+            report['patterns'].append({'tiles': list(pattern), 'build_time': round(seconds, 3),
+                                       'max_depth': depth,
+                                       'bytes': os.path.getsize(file_name(n, pattern, directory))})
+            print(f'  {pattern}: {seconds:.1f} с, глубина до {depth}')
+    report['build_time'] = round(time.perf_counter() - started, 3)
+    with open(meta_name(n, partition, directory), 'w') as file:
+        json.dump(report, file, indent=4)
+    return report
+
+
+class PatternDatabase:
+    """Одна база шаблона, отображённая в память при первом обращении"""
+
+    def __init__(self, n, pattern, directory=DATA_DIR):
+        self.n = n
+        self.pattern = tuple(pattern)
+        self.path = file_name(n, pattern, directory)
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            with open(self.path, 'rb') as file:
+                self._table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._table
+
+    def index(self, tiles):
+        """Индекс записи для плоского массива поля"""
+        size = self.n * self.n
+        cells = {tile: cell for cell, tile in enumerate(tiles)}
+        return sum(cells[tile] * size ** slot for slot, tile in enumerate(self.pattern))
+
+    def __getitem__(self, index):
+        return self.table[index]
+
+    def close(self):
+        if self._table is not None:
+            self._table.close()
+            self._table = None
+
+
+_loaded = {}
+
+
+def load(n, partition=DEFAULT_PARTITION, directory=DATA_DIR):
+    """Базы разбиения, если они собраны, иначе None. Сами файлы открываются лениво"""
+    key = (n, partition, directory)
+    if key not in _loaded:
+        if n != 4 or partition not in PARTITIONS:
+            return None
+        databases = [PatternDatabase(n, pattern, directory) for pattern in PARTITIONS[partition]]
+        if not all(os.path.exists(database.path) for database in databases):
+            return None
+        _loaded[key] = databases
+    return _loaded[key]
+
+
+def estimate(databases, tiles):
+    """Аддитивная оценка числа ходов до победы"""
+    return sum(database[database.index(tiles)] for database in databases)
+
+
+def verify(n=4, partition=DEFAULT_PARTITION, directory=DATA_DIR, samples=20000):
+    """Проверка и замер баз: размер, время сборки, скорость чтения и
+    то, что оценка не меньше манхэттенского расстояния (иначе ValueError)"""
+    from solver import manhattan
+    databases = load(n, partition, directory)
+    if databases is None:
+        raise FileNotFoundError(f'pattern databases {partition} are not built, '
+                                'run "python pattern_db.py build" first')
+    meta = {}
+    if os.path.exists(meta_name(n, partition, directory)):
+        with open(meta_name(n, partition, directory)) as file:
+            meta = json.load(file)
+    print(f'Разбиение {partition}, время сборки: {meta.get("build_time", "?")} с')
+    for database in databases:
+        print(f'  {database.pattern}: {os.path.getsize(database.path) / 2 ** 20:.1f} МБ')
+
+    goal = Puzzle(n)
+    if estimate(databases, goal.tiles) != 0:
+        raise ValueError('goal position must cost 0')
+    rng = random.Random(0)
+    positions = [scramble(n, rng).tiles for _ in range(samples)]
+    indices = [[database.index(tiles) for database in databases] for tiles in positions]
+    for tiles in positions[:1000]:
+        if estimate(databases, tiles) < manhattan(tiles, n):
+            raise ValueError(f'estimate is below Manhattan for {list(tiles)}')
+
+    started = time.perf_counter()
+    total = 0
+    for row in indices:
+        for database, index in zip(databases, row):
+            total += database[index]
+    seconds = time.perf_counter() - started
+    lookups = samples * len(databases)
+    print(f'Чтение: {lookups / seconds:,.0f} обращений/с, '
+          f'средняя оценка {total / samples:.1f} ходов')
+    return {'lookups_per_second': lookups / seconds, 'mean_estimate': total / samples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Базы шаблонов для пятнашек 4 x 4')
+    parser.add_argument('command', choices=('build', 'verify'))
+    parser.add_argument('--partition', default=DEFAULT_PARTITION, choices=sorted(PARTITIONS))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--directory', default=DATA_DIR)
+    args = parser.parse_args()
+    if args.command == 'build':
+        report = build(4, args.partition, args.workers, args.directory)
+        print(f'Готово за {report["build_time"]} с')
+    verify(4, args.partition, args.directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Трассировка для поиска медленных мест: выбранные методы оборачиваются
+в интервалы, которые при выходе сохраняются в формате Chrome trace (открывается
+в chrome://tracing и ui.perfetto.dev). Один метод можно дополнительно снять
+cProfile.
+
+python main.py --trace trace.json [--profile start_game]
+или переменные окружения TAG_TRACE=trace.json TAG_PROFILE=start_game.
+Профиль можно снять и без трассы (python main.py --profile start_game),
+тогда он сохраняется в start_game.prof.
+
+Без трассировки и профиля ничего не оборачивается, поэтому и лишней работы нет."""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+
+
+class Tracer:
+    def __init__(self, path, profile=None):
+        self.path = path
+        self.profile = profile
+        self.profiler = cProfile.Profile() if profile else None
+        self.events = []
+        self.pid = os.getpid()
+        self.started = time.perf_counter()
+        self.threads = set()
+
+    def _record(self, name, started, finished):
+        thread = threading.get_ident()
+        if thread not in self.threads:
+            self.threads.add(thread)
+            self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': thread,
+                                'args': {'name': threading.current_thread().name}})
+        # список дополняется из разных потоков: append в CPython атомарен
+        self.events.append({'name': name, 'ph': 'X', 'pid': self.pid, 'tid': thread,
+                            'ts': (started - self.started) * 1e6,
+                            'dur': (finished - started) * 1e6})
+
+    def wrap(self, cls, name, label=None, when=None):
+        """Замена метода cls.name обёрткой. label(*args) даёт имя интервала,
+        when(*args) решает, записывать ли этот вызов"""
+        function = getattr(cls, name)
+        profiled = name == self.profile
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            if when is not None and not when(*args):
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            if profiled:
+                self.profiler.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                if profiled:
+                    self.profiler.disable()
+                self._record(label(*args) if label is not None else name, started, time.perf_counter())
+
+        setattr(cls, name, traced)
+
+    def wrap_methods(self, cls, names):
+        for name in names:
+            self.wrap(cls, name)
+
+    def save(self):
+        """Запись трассы (если задан её файл) и профиля (если он снимался) на диск"""
+        if self.path is not None:
+            with open(self.path, 'w', encoding='utf8') as file:
+                json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, file)
+        if self.profiler is not None:
+            prefix = f'{self.path}.' if self.path is not None else ''
+            self.profiler.dump_stats(f'{prefix}{self.profile}.prof')
@@ -0,0 +1,97 @@
+"""Запись партии: начальная позиция и ходы по 2 бита (направления engine
+как раз занимают 0..3), четыре хода в байте, младшие биты - ранний ход.
+
+Формат записи (все числа little-endian):
+    версия (1 байт) | n (1 байт) | зерно (8 байт, -1 - неизвестно) |
+    число ходов (4 байта) | начальная позиция (n * n байт) | ходы"""
+import struct
+
+from engine import Puzzle
+
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<BBqI')
+# Полная позиция сохраняется каждые KEYFRAME_INTERVAL ходов
+KEYFRAME_INTERVAL = 64
+
+
+class Recording:
+    """Запись идущей партии. Добавление хода - пара битовых операций,
+    поэтому на обработку нажатия не влияет"""
+
+    __slots__ = ('n', 'initial', 'seed', 'moves', 'count')
+
+    def __init__(self, puzzle, seed=None):
+        if puzzle.size > 256:
+            raise ValueError('only boards up to 16 x 16 can be recorded')
+        self.n = puzzle.n
+        self.initial = bytes(puzzle.tiles)
+        self.seed = seed
+        self.moves = bytearray()
+        self.count = 0
+
+    def append(self, direction):
+        shift = (self.count & 3) * 2
+        if not shift:
+            self.moves.append(direction)
+        else:
+            self.moves[-1] |= direction << shift
+        self.count += 1
+
+    def pack(self):
+        seed = -1 if self.seed is None else self.seed
+        return _HEADER.pack(FORMAT_VERSION, self.n, seed, self.count) + self.initial + self.moves
+
+
+def move_count(blob):
+    """Число ходов записи без распаковки"""
+    return _HEADER.unpack_from(blob)[3]
+
+
+def unpack(blob):
+    """Запись -> (начальная позиция engine.Puzzle, зерно или None, ходы bytes)"""
+    version, n, seed, count = _HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'unknown replay format: {version}')
+    start = _HEADER.size
+    tiles = blob[start:start + n * n]
+    packed = blob[start + n * n:]
+    if len(tiles) != n * n or len(packed) != (count + 3) // 4:
+        raise ValueError('replay is truncated')
+    return Puzzle(n, tiles), None if seed < 0 else seed, unpack_moves(packed, count)
+
+
+# Байт -> четыре хода, чтобы распаковка шла по байтам, а не по битам
+_EXPANDED = [bytes((byte >> shift) & 3 for shift in (0, 2, 4, 6)) for byte in range(256)]
+
+
+def unpack_moves(packed, count):
+    return b''.join(_EXPANDED[byte] for byte in packed)[:count]
+
+
+class Keyframes:
+    """Индекс для перемотки: позиции после каждых every ходов. Любая позиция
+    получается из ближайшего предыдущего снимка не больше чем за every ходов"""
+
+    def __init__(self, puzzle, moves, every=KEYFRAME_INTERVAL):
+        self.n = puzzle.n
+        self.moves = moves
+        self.every = every
+        self.frames = []
+        position = puzzle.copy()
+        for index, direction in enumerate(moves):
+            if index % every == 0:
+                self.frames.append(bytes(position.tiles))
+            position.move(direction)
+        if len(moves) % every == 0:
+            self.frames.append(bytes(position.tiles))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def at(self, index):
+        """Позиция после первых index ходов"""
+        frame, rest = divmod(index, self.every)
+        position = Puzzle(self.n, self.frames[frame])
+        for direction in self.moves[index - rest:index]:
+            position.move(direction)
+        return position
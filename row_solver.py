@@ -0,0 +1,170 @@
+"""Быстрое (не кратчайшее) решение поля любого размера по алгоритму из
+ref/Reference.txt: строки собираются сверху вниз, пока не останется две,
+затем две последние строки собираются по столбцам слева направо и в конце
+прокручивается квадрат 2 x 2.
+
+Замер: python row_solver.py [--sizes 3 4 5 8 10 16] [--samples 20]"""
+import argparse
+import time
+from collections import deque
+from random import Random
+
+from engine import neighbours, OPPOSITE, scramble
+
+
+class _Solver:
+    """Решение на копии поля с запоминанием сделанных ходов"""
+
+    def __init__(self, puzzle):
+        self.puzzle = puzzle.copy()
+        self.n = puzzle.n
+        self.table = neighbours(self.n)
+        self.locked = bytearray(self.n * self.n)
+        self.moves = []
+        self.where = {tile: index for index, tile in enumerate(self.puzzle.tiles)}
+
+    def step(self, index):
+        """Сдвиг пустой клетки в соседнюю клетку index"""
+        for direction, target in self.table[self.puzzle.blank]:
+            if target == index:
+                tile, cell = self.puzzle.move(direction)
+                self.where[tile] = cell
+                self.moves.append(direction)
+                return
+        raise ValueError('cells are not adjacent')
+
+    def path(self, start, goal, avoid=-1):
+        """Кратчайший путь по незакреплённым клеткам (без start, с goal)"""
+        if start == goal:
+            return []
+        parent = {start: None}
+        queue = deque((start,))
+        while queue:
+            cell = queue.popleft()
+            for _, target in self.table[cell]:
+                if target in parent or self.locked[target] or target == avoid:
+                    continue
+                parent[target] = cell
+                if target == goal:
+                    result = []
+                    while target != start:
+                        result.append(target)
+                        target = parent[target]
+                    return result[::-1]
+                queue.append(target)
+        raise ValueError('no path between cells')
+
+    def move_blank(self, goal, avoid=-1):
+        for cell in self.path(self.puzzle.blank, goal, avoid):
+            self.step(cell)
+
+    def move_tile(self, tile, goal):
+        """Перемещение кирпичика tile в клетку goal, не трогая закреплённые"""
+        for cell in self.path(self.where[tile], goal):
+            # пустая клетка обходит кирпичик и встаёт перед ним
+            self.move_blank(cell, avoid=self.where[tile])
+            self.step(self.where[tile])
+
+    def place(self, tile, goal):
+        self.move_tile(tile, goal)
+        self.locked[goal] = 1
+
+    def leave_corner(self, outer, shift):
+        if self.puzzle.blank == outer:
+            self.step(outer + shift)
+
+    def place_pair(self, first, second, first_goal, second_goal, outer, shift):
+        """Последние два кирпичика строки (столбца): second ставится на место
+        first, first - рядом с ним, а затем пустая клетка из outer (место second)
+        заводит их на места двумя ходами"""
+        if self.where[first] == first_goal and self.where[second] == second_goal:
+            self.locked[first_goal] = self.locked[second_goal] = 1
+            return
+        self.move_tile(second, first_goal)
+        # Угол outer - тупик: пустая клетка, оставшаяся в нём, запрёт first
+        self.leave_corner(outer, shift)
+        if self.where[first] == outer:
+            # first оказался в углу, откуда его не вывести, не сдвинув second:
+            # отводим first подальше и ставим second заново
+            far = outer + 2 * shift
+            self.move_tile(first, far)
+            self.locked[far] = 1
+            self.move_tile(second, first_goal)
+            self.leave_corner(outer, shift)
+            self.locked[far] = 0
+        self.locked[first_goal] = 1
+        self.move_tile(first, first_goal + shift)
+        self.locked[first_goal + shift] = 1
+        self.move_blank(outer)
+        self.locked[first_goal] = self.locked[first_goal + shift] = 0
+        self.step(first_goal)
+        self.step(first_goal + shift)
+        self.locked[first_goal] = self.locked[second_goal] = 1
+
+    def run(self):
+        n = self.n
+        # Стадия 1: все строки, кроме двух последних
+        for row in range(n - 2):
+            for col in range(n - 2):
+                self.place(row * n + col, row * n + col)
+            first, second = row * n + n - 2, row * n + n - 1
+            self.place_pair(first, second, first, second, second, n)
+        # Стадия 2: две последние строки по столбцам
+        for col in range(n - 2):
+            first, second = (n - 2) * n + col, (n - 1) * n + col
+            self.place_pair(first, second, first, second, second, 1)
+        # Квадрат 2 x 2 прокручивается по кругу до победы
+        corner = n * n - 1
+        cycle = (corner, corner - 1, corner - 1 - n, corner - n)
+        self.move_blank(corner)
+        for _ in range(3):
+            if self.puzzle.is_solved():
+                break
+            for cell in cycle[1:] + cycle[:1]:
+                self.step(cell)
+        if not self.puzzle.is_solved():
+            raise ValueError('puzzle is not solvable')
+        return simplify(self.moves)
+
+
+def simplify(moves):
+    """Удаление пар взаимно обратных ходов (туда-обратно), в том числе вложенных"""
+    result = []
+    for direction in moves:
+        if result and result[-1] == OPPOSITE[direction]:
+            result.pop()
+        else:
+            result.append(direction)
+    return result
+
+
+def solve(puzzle):
+    """Решение позиции puzzle (engine.Puzzle) за полиномиальное время.
+    Возвращает список ходов (направлений из engine)"""
+    return _Solver(puzzle).run()
+
+
+def benchmark(sizes=(3, 4, 5, 8, 10, 16), samples=20, seed=0):
+    """Среднее число ходов и время решения в зависимости от размера поля"""
+    rng = Random(seed)
+    report = []
+    for n in sizes:
+        puzzles = [scramble(n, rng) for _ in range(samples)]
+        started = time.perf_counter()
+        lengths = [len(solve(puzzle)) for puzzle in puzzles]
+        seconds = (time.perf_counter() - started) / samples
+        report.append({'n': n, 'moves': sum(lengths) / samples, 'seconds': seconds})
+        print(f'{n:>3} x {n:<3} ходов: {sum(lengths) / samples:8.1f}   время: {seconds * 1000:8.2f} мс')
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер решателя по строкам')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 4, 5, 8, 10, 16])
+    parser.add_argument('--samples', type=int, default=20)
+    args = parser.parse_args()
+    benchmark(args.sizes, args.samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""Общая таблица лидеров по HTTP (только стандартная библиотека), которую
+можно запустить у себя вместо настоящего сервера:
+python server.py serve [--port 8765] [--database data/server.db]
+
+Игра отправляет на него результаты, если задан адрес (см. online.py).
+
+POST /scores  {"scores": [{"name": ..., "rows": 4, "cols": 4, "time": 12.5, "level": 0}, ...]}
+GET  /top?rows=4&cols=4&limit=10&level=0
+
+level - номер уровня сложности в difficulty.LEVELS (необязательный, 0 - любая позиция).
+
+Нагрузочный тест (сервер поднимается в отдельном процессе):
+python server.py loadtest [--clients 2000] [--requests 10]"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import leaderboard
+from difficulty import LEVELS
+
+# Результаты со всех соединений копятся и пишутся одной транзакцией не реже,
+# чем раз в COMMIT_INTERVAL секунд, или сразу, если их набралось COMMIT_BATCH
+COMMIT_INTERVAL = 0.05
+COMMIT_BATCH = 5000
+MAX_BATCH = 1000
+MAX_BODY = 2 ** 20
+MAX_SIDE = 64
+TOP_MAX = 100
+# Сколько разных рейтингов (размер, уровень, limit) держится в кэше
+TOP_CACHE = 256
+
+
+class Store:
+    """Хранилище на SQLite. Все обращения к базе идут в одном потоке, чтобы
+    не держать цикл событий, а прочитанные рейтинги кэшируются до следующей
+    записи (не больше TOP_CACHE последних запрошенных)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.con = None
+        self.pending = []
+        self.waiters = []
+        self.wakeup = asyncio.Event()
+        self.tops = OrderedDict()
+        self.committed = 0
+
+    def _connect(self):
+        self.con = leaderboard.connect(self.path)
+
+    def _commit(self, scores):
+        with self.con:
+            self.con.executemany(leaderboard.RECORD, scores)
+            self.con.executemany(leaderboard.RECORD_GAME, scores)
+
+    def _top(self, rows, cols, limit, level):
+        return [[name, seconds] for _, name, _, seconds
+                in leaderboard.top(self.con, rows, cols, limit, level)]
+
+    async def run(self):
+        """Групповая запись: каждая отправка ждёт только ближайшей транзакции"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._connect)
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), COMMIT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            if not self.pending:
+                continue
+            scores, waiters = self.pending, self.waiters
+            self.pending, self.waiters = [], []
+            try:
+                await loop.run_in_executor(self.executor, self._commit, scores)
+            except Exception as error:
+                for waiter in waiters:
+                    waiter.set_exception(error)
+                continue
+            self.tops.clear()
+            self.committed += len(scores)
+            for waiter in waiters:
+                waiter.set_result(None)
+
+    async def submit(self, scores):
+        waiter = asyncio.get_running_loop().create_future()
+        self.pending.extend(scores)
+        self.waiters.append(waiter)
+        if len(self.pending) >= COMMIT_BATCH:
+            self.wakeup.set()
+        await waiter
+
+    async def top(self, rows, cols, limit, level):
+        key = rows, cols, limit, level
+        if key in self.tops:
+            self.tops.move_to_end(key)
+            return self.tops[key]
+        committed = self.committed
+        result = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._top, rows, cols, limit, level)
+        # за время чтения могла пройти запись: такой результат не кэшируется
+        if committed == self.committed:
+            self.tops[key] = result
+            if len(self.tops) > TOP_CACHE:
+                self.tops.popitem(last=False)
+        return result
+
+
+def check_score(name, rows, cols, seconds, level=leaderboard.ANY_LEVEL):
+    """Один результат в том виде, в котором он будет записан (имя обрезается
+    до 64 символов): параметры leaderboard.RECORD. Результат, который сервер
+    не примет, - ValueError. Этой же проверкой игра отсеивает результаты до
+    отправки (см. online.py)"""
+    rows, cols, seconds, level = int(rows), int(cols), float(seconds), int(level)
+    if not isinstance(name, str) or not name or not 2 <= rows <= MAX_SIDE \
+            or not 2 <= cols <= MAX_SIDE or not math.isfinite(seconds) or not seconds > 0 \
+            or not 0 <= level < len(LEVELS):
+        raise ValueError(f'bad score: {(name, rows, cols, seconds, level)}')
+    return name[:64], rows, cols, seconds, level
+
+
+def check_top(rows, cols, limit, level):
+    """Параметры запроса рейтинга: размер и уровень проверяются как у
+    результатов, limit приводится к 1..TOP_MAX, чтобы ключ кэша не зависел
+    от произвольных чисел клиента"""
+    rows, cols, limit, level = int(rows), int(cols), int(limit), int(level)
+    if not 2 <= rows <= MAX_SIDE or not 2 <= cols <= MAX_SIDE or not 0 <= level < len(LEVELS):
+        raise ValueError(f'bad category: {(rows, cols, level)}')
+    return rows, cols, min(max(limit, 1), TOP_MAX), level
+
+
+def parse_scores(body):
+    """Проверка присланной пачки: [(name, rows, cols, time), ...]"""
+    scores = json.loads(body)['scores']
+    if not isinstance(scores, list) or len(scores) > MAX_BATCH:
+        raise ValueError('scores must be a list of at most %d items' % MAX_BATCH)
+    return [check_score(score['name'], score['rows'], score['cols'], score['time'],
+                        score.get('level', leaderboard.ANY_LEVEL))
+            for score in scores]
+
+
+class Server:
+    def __init__(self, store):
+        self.store = store
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        """Одно соединение HTTP/1.1 с keep-alive: запросы обрабатываются по очереди"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode('latin1').split(' ', 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = header.decode('latin1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {'error': 'body too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, answer = await self.dispatch(method, target, body)
+                self.requests += 1
+                await self.respond(writer, status, answer)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        try:
+            if method == 'POST' and url.path == '/scores':
+                scores = parse_scores(body)
+                await self.store.submit(scores)
+                return 200, {'accepted': len(scores)}
+            if method == 'GET' and url.path == '/top':
+                query = parse_qs(url.query)
+                rows, cols, limit, level = check_top(query['rows'][0], query['cols'][0],
+                                                     query.get('limit', ['10'])[0],
+                                                     query.get('level', [leaderboard.ANY_LEVEL])[0])
+                return 200, {'top': await self.store.top(rows, cols, limit, level)}
+        except (KeyError, TypeError, ValueError) as error:
+            return 400, {'error': str(error)}
+        except sqlite3.Error as error:
+            return 500, {'error': str(error)}
+        return 404, {'error': 'not found'}
+
+    @staticmethod
+    async def respond(writer, status, answer):
+        body = json.dumps(answer, ensure_ascii=False).encode('utf8')
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                  500: 'Internal Server Error'}[status]
+        writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\n\r\n'.encode('latin1') + body)
+        await writer.drain()
+
+
+async def serve(host, port, database):
+    store = Store(database)
+    server = Server(store)
+    committer = asyncio.ensure_future(store.run())
+    listener = await asyncio.start_server(server.handle, host, port, backlog=4096)
+    print(f'Таблица лидеров: http://{host}:{port} ({database})', flush=True)
+    async with listener:
+        await asyncio.gather(listener.serve_forever(), committer)
+
+
+async def _client(host, port, requests, latencies, rng):
+    """Один игрок: одно соединение, чередование отправок и запросов рейтинга"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            size = rng.choice((3, 4, 5))
+            if rng.random() < 0.5:
+                body = json.dumps({'scores': [
+                    {'name': f'player{rng.randrange(100000)}', 'rows': size, 'cols': size,
+                     'time': rng.uniform(5, 3600)} for _ in range(rng.randint(1, 20))]}).encode()
+                request = (f'POST /scores HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n'
+                           f'\r\n').encode() + body
+            else:
+                request = f'GET /top?rows={size}&cols={size}&limit=10 HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode()
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                header = await reader.readline()
+                if header == b'\r\n':
+                    break
+                if header.lower().startswith(b'content-length:'):
+                    length = int(header.split(b':')[1])
+            await reader.readexactly(length)
+            if b' 200 ' not in status:
+                raise RuntimeError(status.decode().strip())
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def _load(host, port, clients, requests):
+    latencies = []
+    rng = random.Random(0)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_client(host, port, requests, latencies, random.Random(rng.random()))
+                                     for _ in range(clients)), return_exceptions=True)
+    seconds = time.perf_counter() - started
+    errors = [result for result in results if isinstance(result, Exception)]
+    latencies.sort()
+
+    def percentile(point):
+        return latencies[min(len(latencies) - 1, len(latencies) * point // 100)] * 1000
+
+    print(f'{clients} клиентов, {len(latencies)} запросов за {seconds:.1f} с '
+          f'({len(latencies) / seconds:,.0f} запросов/с), ошибок: {len(errors)}')
+    if latencies:
+        print(f'  задержка: p50 {percentile(50):.1f} мс, p90 {percentile(90):.1f} мс, '
+              f'p99 {percentile(99):.1f} мс')
+    if errors:
+        print('  первая ошибка:', repr(errors[0]))
+
+
+def loadtest(clients, requests, port):
+    """Сервер запускается отдельным процессом на временной базе"""
+    with tempfile.TemporaryDirectory() as directory:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--port', str(port),
+                                    '--database', os.path.join(directory, 'server.db')],
+                                   stdout=subprocess.PIPE, text=True)
+        try:
+            process.stdout.readline()
+            asyncio.run(_load('127.0.0.1', port, clients, requests))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сервер таблицы лидеров')
+    parser.add_argument('command', choices=('serve', 'loadtest'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--database', default='data/server.db')
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+    if args.command == 'serve':
+        os.makedirs(os.path.dirname(args.database) or '.', exist_ok=True)
+        try:
+            asyncio.run(serve(args.host, args.port, args.database))
+        except KeyboardInterrupt:
+            pass
+    else:
+        loadtest(args.clients, args.requests, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""Поиск оптимального решения пятнашек (IDA*) без зависимости от PyQt"""
+import pattern_db
+from engine import targets, is_solvable
+
+# Как часто (в узлах перебора) проверяется просьба остановить поиск
+CANCEL_CHECK_PERIOD = 4096
+
+
+class Cancelled(Exception):
+    """Поиск был остановлен извне (например, игрок сделал ход)"""
+
+
+_conflict_cache = {}
+
+
+def line_conflict(goals):
+    """Штраф линейного конфликта для одной строки (столбца).
+    goals - правильные позиции вдоль линии кирпичиков, которые в этой линии
+    и должны стоять, в порядке их текущего расположения. Каждый кирпичик,
+    который придётся вывести из линии, чтобы остальные шли по порядку,
+    добавляет два хода. Их минимум - длина без наибольшей возрастающей
+    подпоследовательности"""
+    conflict = _conflict_cache.get(goals)
+    if conflict is None:
+        tails = []
+        for goal in goals:
+            low, high = 0, len(tails)
+            while low < high:
+                middle = (low + high) // 2
+                if tails[middle] < goal:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == len(tails):
+                tails.append(goal)
+            else:
+                tails[low] = goal
+        conflict = _conflict_cache[goals] = 2 * (len(goals) - len(tails))
+    return conflict
+
+
+def _row_goals(tiles, n, row):
+    blank = n * n - 1
+    return tuple(tile % n for tile in tiles[row * n:row * n + n]
+                 if tile != blank and tile // n == row)
+
+
+def _col_goals(tiles, n, col):
+    blank = n * n - 1
+    return tuple(tile // n for tile in tiles[col::n]
+                 if tile != blank and tile % n == col)
+
+
+def manhattan(tiles, n):
+    """Сумма манхэттенских расстояний кирпичиков до своих мест"""
+    blank = n * n - 1
+    return sum(abs(index // n - tile // n) + abs(index % n - tile % n)
+               for index, tile in enumerate(tiles) if tile != blank)
+
+
+def linear_conflict(tiles, n):
+    return sum(line_conflict(_row_goals(tiles, n, line)) +
+               line_conflict(_col_goals(tiles, n, line)) for line in range(n))
+
+
+def heuristic(tiles, n):
+    """Допустимая оценка числа ходов: манхэттен + линейные конфликты"""
+    return manhattan(tiles, n) + linear_conflict(tiles, n)
+
+
+class ConflictEstimator:
+    """Манхэттенское расстояние + линейные конфликты с пересчётом только
+    двух затронутых ходом линий"""
+
+    def __init__(self, tiles, n):
+        self.n = n
+        size = n * n
+        self.distance = [[abs(index // n - tile // n) + abs(index % n - tile % n)
+                          for index in range(size)] for tile in range(size)]
+        self.coords = [divmod(index, n) for index in range(size)]
+        self.rows = [line_conflict(_row_goals(tiles, n, line)) for line in range(n)]
+        self.cols = [line_conflict(_col_goals(tiles, n, line)) for line in range(n)]
+        self.h = manhattan(tiles, n) + sum(self.rows) + sum(self.cols)
+        self.history = []
+
+    def move(self, tiles, tile, source, target):
+        """Изменение оценки после того, как tile уже переехал из source в target"""
+        n = self.n
+        row_from, col_from = self.coords[source]
+        row_to, col_to = self.coords[target]
+        delta = self.distance[tile][target] - self.distance[tile][source]
+        if row_from == row_to:
+            lines, first, second, goals = self.cols, col_from, col_to, _col_goals
+        else:
+            lines, first, second, goals = self.rows, row_from, row_to, _row_goals
+        old = lines[first], lines[second]
+        lines[first] = line_conflict(goals(tiles, n, first))
+        lines[second] = line_conflict(goals(tiles, n, second))
+        self.history.append((lines, first, second, old))
+        return delta + lines[first] + lines[second] - old[0] - old[1]
+
+    def undo(self, tile, source, target):
+        lines, first, second, old = self.history.pop()
+        lines[first], lines[second] = old
+
+
+class PatternEstimator:
+    """Сумма значений аддитивных баз шаблонов (pattern_db). Ход меняет индекс
+    только одной базы, поэтому пересчёт - два обращения к памяти"""
+
+    def __init__(self, tiles, n, databases):
+        size = n * n
+        self.slots = {}
+        self.tables = [database.table for database in databases]
+        self.indices = [database.index(tiles) for database in databases]
+        for number, database in enumerate(databases):
+            for slot, tile in enumerate(database.pattern):
+                self.slots[tile] = number, size ** slot
+        self.h = sum(table[index] for table, index in zip(self.tables, self.indices))
+
+    def move(self, tiles, tile, source, target):
+        number, weight = self.slots[tile]
+        table = self.tables[number]
+        old = self.indices[number]
+        self.indices[number] = new = old + (target - source) * weight
+        return table[new] - table[old]
+
+    def undo(self, tile, source, target):
+        number, weight = self.slots[tile]
+        self.indices[number] -= (target - source) * weight
+
+
+def estimator_for(tiles, n, databases=None):
+    """Лучшая доступная оценка: базы шаблонов, если они собраны, иначе конфликты"""
+    if databases is None:
+        databases = pattern_db.load(n)
+    if databases:
+        return PatternEstimator(tiles, n, databases)
+    return ConflictEstimator(tiles, n)
+
+
+def solve(puzzle, cancelled=None, databases=None):
+    """Оптимальное решение позиции puzzle (engine.Puzzle) алгоритмом IDA*.
+    Возвращает список ходов (направлений из engine) или бросает Cancelled,
+    если функция cancelled вернула True"""
+    n = puzzle.n
+    size = n * n
+    tiles = list(puzzle.tiles)
+    if not is_solvable(tiles, n):
+        raise ValueError('puzzle is not solvable')
+    moves = targets(n)
+    estimator = estimator_for(tiles, n, databases)
+    move, undo = estimator.move, estimator.undo
+    h = estimator.h
+    nodes = 0
+    path = []
+    # несуществующее направление 4 не совпадает ни с одним обратным ходом
+    opposite = (1, 0, 3, 2, None)
+
+    def search(g, bound, blank, previous):
+        nonlocal h, nodes
+        f = g + h
+        if f > bound:
+            return f
+        if h == 0:
+            return -1
+        nodes += 1
+        if cancelled is not None and nodes % CANCEL_CHECK_PERIOD == 0 and cancelled():
+            raise Cancelled
+        current = h
+        minimum = None
+        for direction, index in enumerate(moves[blank]):
+            if index == -1 or direction == opposite[previous]:
+                continue
+            tile = tiles[index]
+            tiles[blank], tiles[index] = tile, size - 1
+            h = current + move(tiles, tile, index, blank)
+            path.append(direction)
+            result = search(g + 1, bound, index, direction)
+            if result == -1:
+                return -1
+            path.pop()
+            h = current
+            tiles[blank], tiles[index] = size - 1, tile
+            undo(tile, index, blank)
+            if minimum is None or result < minimum:
+                minimum = result
+        return minimum
+
+    bound = h
+    while True:
+        result = search(0, bound, puzzle.blank, 4)
+        if result == -1:
+            return path
+        bound = result
+
+
+def next_move(puzzle, cancelled=None):
+    """Первый ход оптимального решения или None для собранного поля"""
+    path = solve(puzzle, cancelled)
+    return path[0] if path else None
@@ -0,0 +1,31 @@
+from random import Random
+
+import difficulty
+from engine import scramble
+
+
+def test_any_level_is_a_plain_scramble():
+    assert difficulty.generate(4, difficulty.LEVELS[0], Random(3)) == scramble(4, Random(3))
+
+
+def test_generated_positions_fit_the_band():
+    for level in difficulty.LEVELS[1:]:
+        low, high = difficulty.band(3, level)
+        for seed in range(5):
+            assert low <= difficulty.distance(difficulty.generate(3, level, Random(seed))) <= high
+
+
+def test_take_reports_the_level_it_delivers(monkeypatch):
+    pool = difficulty.ScramblePool(size=0)
+    monkeypatch.setattr(difficulty, 'ready', lambda n: False)
+    seed, puzzle, level = pool.take(3, 'Сложная')
+    assert level == difficulty.LEVELS[0]
+    assert difficulty.generate(3, level, Random(seed)) == puzzle
+    monkeypatch.undo()
+    seed, puzzle, level = pool.take(3, 'Сложная')
+    assert level == 'Сложная'
+    assert difficulty.generate(3, level, Random(seed)) == puzzle
+
+
+def test_sizes_without_bands_are_any_level():
+    assert difficulty.ScramblePool(size=0).take(5, 'Сложная')[2] == difficulty.LEVELS[0]
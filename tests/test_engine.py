@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from engine import DOWN, RIGHT, UP, Puzzle, is_solvable, scramble
+
+
+def test_solved_board():
+    puzzle = Puzzle(4)
+    assert puzzle.is_solved()
+    assert puzzle.in_place == 16
+    assert puzzle.blank == 15
+    assert set(puzzle.legal_moves()) == {DOWN, RIGHT}
+
+
+def test_move_and_back():
+    puzzle = Puzzle(3)
+    assert puzzle.move(UP) is None
+    assert puzzle.move(DOWN) == (5, 8)
+    assert puzzle.blank == 5
+    assert puzzle.in_place == 7
+    assert not puzzle.is_solved()
+    assert puzzle.move(UP) == (5, 5)
+    assert puzzle.is_solved()
+
+
+def test_in_place_matches_recount():
+    rng = random.Random(1)
+    puzzle = Puzzle(5)
+    for _ in range(2000):
+        puzzle.move(rng.choice(puzzle.legal_moves()))
+        assert puzzle.in_place == sum(index == tile for index, tile in enumerate(puzzle.tiles))
+
+
+def test_matrix_round_trip():
+    puzzle = scramble(4, random.Random(2))
+    assert Puzzle.from_matrix(puzzle.to_matrix()) == puzzle
+
+
+def test_copy_is_independent():
+    puzzle = Puzzle(3)
+    other = puzzle.copy()
+    other.move(RIGHT)
+    assert puzzle.is_solved() and not other.is_solved()
+
+
+def test_rejects_bad_tiles():
+    with pytest.raises(ValueError):
+        Puzzle(2, [0, 0, 1, 3])
+
+
+@pytest.mark.parametrize('n', [2, 3, 4, 5])
+def test_reachable_positions_are_solvable(n):
+    rng = random.Random(n)
+    puzzle = Puzzle(n)
+    for _ in range(500):
+        puzzle.move(rng.choice(puzzle.legal_moves()))
+        assert is_solvable(puzzle.tiles, n)
+
+
+@pytest.mark.parametrize('n', [2, 3, 4])
+def test_swapped_tiles_are_not_solvable(n):
+    tiles = list(range(n * n))
+    tiles[0], tiles[1] = tiles[1], tiles[0]
+    assert not is_solvable(tiles, n)
+
+
+@pytest.mark.parametrize('n', [2, 3, 4, 7])
+def test_scramble(n):
+    rng = random.Random(n)
+    for _ in range(50):
+        puzzle = scramble(n, rng)
+        assert is_solvable(puzzle.tiles, n)
+        assert not puzzle.is_solved()
+
+
+def test_scramble_is_seeded():
+    assert scramble(4, random.Random(5)) == scramble(4, random.Random(5))
@@ -0,0 +1,31 @@
+import random
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from classes.hint import HintWorker  # noqa: E402
+from engine import scramble  # noqa: E402
+
+
+def run(worker):
+    results = []
+    worker.signals.found.connect(lambda generation, path: results.append(('found', generation, path)))
+    worker.signals.timed_out.connect(lambda generation: results.append(('timed_out', generation)))
+    worker.run()
+    return results
+
+
+def test_hint_is_found():
+    results = run(HintWorker(scramble(3, random.Random(0)), 1))
+    assert results[0][:2] == ('found', 1) and results[0][2]
+
+
+def test_search_over_budget_gives_up():
+    assert run(HintWorker(scramble(4, random.Random(0)), 2, budget=0.05)) == [('timed_out', 2)]
+
+
+def test_cancelled_search_is_silent():
+    worker = HintWorker(scramble(4, random.Random(0)), 3, budget=10)
+    worker.cancel()
+    assert run(worker) == []
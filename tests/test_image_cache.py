@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtGui import QImage, QColor  # noqa: E402
+
+from classes.image_cache import ImageCache  # noqa: E402
+
+
+def image(side=64):
+    result = QImage(side, side, QImage.Format_RGB32)
+    result.fill(QColor('teal'))
+    return result
+
+
+def test_disk_hit_keeps_file_from_eviction(tmp_path):
+    writer = ImageCache(directory=str(tmp_path))
+    writer.put('old', image())
+    writer.put('new', image())
+    # старый файл старше нового
+    os.utime(writer.disk_path('old'), (1, 1))
+    os.utime(writer.disk_path('new'), (2, 2))
+
+    reader = ImageCache(directory=str(tmp_path))
+    assert reader.get('old') is not None
+    reader.disk_limit = os.path.getsize(reader.disk_path('old')) * 2
+    reader.put('third', image())
+
+    assert os.path.exists(reader.disk_path('old'))
+    assert not os.path.exists(reader.disk_path('new'))
+
+
+def test_fifo_evicts_oldest_file(tmp_path):
+    writer = ImageCache(directory=str(tmp_path))
+    writer.put('old', image())
+    writer.put('new', image())
+    os.utime(writer.disk_path('old'), (1, 1))
+    os.utime(writer.disk_path('new'), (2, 2))
+
+    reader = ImageCache(policy='fifo', directory=str(tmp_path))
+    assert reader.get('old') is not None
+    reader.disk_limit = os.path.getsize(reader.disk_path('old')) * 2
+    reader.put('third', image())
+
+    assert not os.path.exists(reader.disk_path('old'))
+    assert os.path.exists(reader.disk_path('new'))
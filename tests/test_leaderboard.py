@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+
+import pytest
+
+import leaderboard
+
+
+@pytest.fixture
+def con(tmp_path):
+    con = leaderboard.connect(str(tmp_path / 'leaderboard.db'))
+    yield con
+    con.close()
+
+
+def make_v1(path, rows):
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE leaders (name STRING, field_size STRING, time)')
+    con.executemany('INSERT INTO leaders VALUES (?, ?, ?)', rows)
+    con.commit()
+    con.close()
+
+
+def version(con):
+    return con.execute('PRAGMA user_version').fetchone()[0]
+
+
+def test_fresh_database(con):
+    assert version(con) == leaderboard.SCHEMA_VERSION
+    assert leaderboard.top(con, 4, 4) == []
+
+
+def test_migration_from_v1(tmp_path):
+    path = str(tmp_path / 'old.db')
+    make_v1(path, [('a', '4 x 4', '12.5'), ('a', '4 x 4', '9'), (None, '3 x 3', 30),
+                   ('b', 'broken', 1)])
+    con = leaderboard.connect(path)
+    assert version(con) == leaderboard.SCHEMA_VERSION
+    assert [row[1:] for row in leaderboard.top(con, 4, 4)] == [('a', '4 x 4', 9.0)]
+    assert [row[1:] for row in leaderboard.top(con, 3, 3)] == [(leaderboard.UNNAMED, '3 x 3', 30.0)]
+    assert sum(leaderboard.histogram(con, 4, 4)) == 1
+    assert leaderboard.player_stats(con, 4, 4) == [('a', 9.0, 1, 9.0)]
+    con.close()
+
+
+def test_failed_step_is_rolled_back(tmp_path, monkeypatch):
+    path = str(tmp_path / 'old.db')
+    make_v1(path, [('a', '4 x 4', 12)])
+
+    def broken(con):
+        raise sqlite3.OperationalError('boom')
+
+    monkeypatch.setattr(leaderboard, '_MIGRATIONS', leaderboard._MIGRATIONS[:1] + ((3, broken),))
+    with pytest.raises(sqlite3.OperationalError):
+        leaderboard.connect(path)
+    monkeypatch.undo()
+    con = leaderboard.connect(path)
+    assert version(con) == leaderboard.SCHEMA_VERSION
+    assert [row[1:] for row in leaderboard.top(con, 4, 4)] == [('a', '4 x 4', 12.0)]
+    con.close()
+
+
+def test_record_keeps_best_time(con):
+    leaderboard.record(con, 'a', 4, 4, 20.0)
+    leaderboard.record(con, 'a', 4, 4, 10.0)
+    leaderboard.record(con, 'a', 4, 4, 15.0)
+    assert [row[1:] for row in leaderboard.top(con, 4, 4)] == [('a', '4 x 4', 10.0)]
+    assert leaderboard.player_stats(con, 4, 4) == [('a', 10.0, 3, 15.0)]
+
+
+@pytest.mark.parametrize('extension', ['csv', 'jsonl'])
+def test_export_import_round_trip(con, tmp_path, extension):
+    for index in range(10):
+        leaderboard.record(con, f'p{index}', 3 + index % 2, 3 + index % 2, 10.0 + index)
+    file_name = str(tmp_path / f'leaders.{extension}')
+    assert leaderboard.export(con, file_name) == 10
+    other = leaderboard.connect(str(tmp_path / 'other.db'))
+    assert leaderboard.merge(other, leaderboard.read_rows(file_name)) == 10
+    query = 'SELECT name, rows, cols, time, created_at FROM leaders ORDER BY name'
+    assert other.execute(query).fetchall() == con.execute(query).fetchall()
+    other.close()
+
+
+def test_export_rejects_other_formats(con, tmp_path):
+    for name in ('leaders.db', 'leaders.txt'):
+        with pytest.raises(ValueError):
+            leaderboard.export(con, str(tmp_path / name))
+        assert not (tmp_path / name).exists()
+
+
+def test_merge_database_leaves_source_untouched(con, tmp_path):
+    path = tmp_path / 'old.db'
+    make_v1(str(path), [('a', '4 x 4', 12), ('b', '4 x 4', 8)])
+    before = path.read_bytes()
+    leaderboard.record(con, 'a', 4, 4, 10.0)
+    assert leaderboard.merge_database(con, str(path)) == 2
+    assert path.read_bytes() == before
+    assert [row[1:] for row in leaderboard.top(con, 4, 4)] == [('b', '4 x 4', 8.0),
+                                                               ('a', '4 x 4', 10.0)]
+
+
+def test_service_writes_in_background(tmp_path):
+    service = leaderboard.LeaderboardService(str(tmp_path / 'leaderboard.db'))
+    for index in range(100):
+        service.record(f'p{index}', 4, 4, 1.0 + index)
+    service.flush()
+    assert len(service.top(4, 4)) == 100
+    service.close()
+
+
+def test_service_reports_written_results(tmp_path):
+    written = threading.Event()
+    service = leaderboard.LeaderboardService(str(tmp_path / 'leaderboard.db'), written.set)
+    service.record('p', 4, 4, 1.0)
+    assert written.wait(5)
+    # без flush(): результат уже виден соединению для чтения
+    assert [row[1] for row in service.top(4, 4)] == ['p']
+    service.close()
+
+
+def test_levels_are_ranked_separately(con):
+    leaderboard.record(con, 'a', 3, 3, 10.0, level=3)
+    leaderboard.record(con, 'a', 3, 3, 20.0)
+    assert [row[3] for row in leaderboard.top(con, 3, 3)] == [20.0]
+    assert [row[3] for row in leaderboard.top(con, 3, 3, level=3)] == [10.0]
+    assert sum(leaderboard.histogram(con, 3, 3, level=3)) == 1
+    assert leaderboard.percentiles(con, 3, 3, level=3)[50] == 10.0
+    assert leaderboard.player_stats(con, 3, 3, level=3) == [('a', 10.0, 1, 10.0)]
+
+
+def test_migration_from_v4_keeps_results_at_any_level(tmp_path, monkeypatch):
+    path = str(tmp_path / 'v4.db')
+    monkeypatch.setattr(leaderboard, 'SCHEMA_VERSION', 4)
+    monkeypatch.setattr(leaderboard, '_MIGRATIONS', leaderboard._MIGRATIONS[:3])
+    con = leaderboard.connect(path)
+    con.execute("INSERT INTO leaders (name, rows, cols, time) VALUES ('a', 4, 4, 12)")
+    con.execute("INSERT INTO players VALUES (4, 4, 'a', 3, 40)")
+    con.commit()
+    con.close()
+    monkeypatch.undo()
+    con = leaderboard.connect(path)
+    assert version(con) == leaderboard.SCHEMA_VERSION
+    assert leaderboard.player_stats(con, 4, 4) == [('a', 12.0, 3, 40 / 3)]
+    assert sum(leaderboard.histogram(con, 4, 4)) == 1
+    leaderboard.record(con, 'a', 4, 4, 11.0, level=1)
+    assert sum(leaderboard.histogram(con, 4, 4, level=1)) == 1
+    con.close()
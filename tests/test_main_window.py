@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+pytest.importorskip('PyQt5')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+import tools  # noqa: E402
+from classes import main_window  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    # картинки и шрифты читаются из папки проекта, а база - во временной папке
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(main_window, 'make_game_files',
+                        lambda obj: tools.make_game_files(obj, str(tmp_path / 'data')))
+    monkeypatch.setattr(main_window, 'PREBUILD_SCREENS', False)
+    window = main_window.MainWindow()
+    window.show()
+    yield window
+    window.close()
+
+
+@pytest.mark.parametrize('screen', ['settings', 'tips', 'leader_board_show'])
+def test_prebuild_keeps_screen_opened_before_it(window, screen):
+    getattr(window, screen)()
+    shown = [widget for widget in window.findChildren(main_window.QLabel)
+             if widget.isVisibleTo(window)]
+    while len(window.built) < len(window.builders):
+        window.prebuild()
+
+    assert window.go_to_menu_btn.isVisibleTo(window)
+    assert all(widget.isVisibleTo(window) for widget in shown)
+    # и ни одно достроенное окно не появилось поверх открытого
+    assert [widget for widget in window.findChildren(main_window.QLabel)
+            if widget.isVisibleTo(window)] == shown
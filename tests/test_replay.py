@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+import replay
+from engine import Puzzle, scramble
+
+
+def record_game(n, count, seed):
+    rng = random.Random(seed)
+    puzzle = scramble(n, rng)
+    recording = replay.Recording(puzzle, seed)
+    position = puzzle.copy()
+    for _ in range(count):
+        direction = rng.choice(position.legal_moves())
+        position.move(direction)
+        recording.append(direction)
+    return puzzle, recording, position
+
+
+@pytest.mark.parametrize('count', [0, 1, 3, 4, 5, 64, 257])
+def test_round_trip(count):
+    puzzle, recording, position = record_game(4, count, count)
+    blob = recording.pack()
+    assert replay.move_count(blob) == count
+    initial, seed, moves = replay.unpack(blob)
+    assert initial == puzzle
+    assert seed == count
+    assert len(moves) == count
+    assert replay.Keyframes(initial, moves).at(count) == position
+
+
+def test_unknown_seed():
+    blob = replay.Recording(Puzzle(3)).pack()
+    assert replay.unpack(blob)[1] is None
+
+
+def test_keyframes_match_replay():
+    puzzle, recording, _ = record_game(5, 300, 7)
+    initial, _, moves = replay.unpack(recording.pack())
+    frames = replay.Keyframes(initial, moves, every=16)
+    position = initial.copy()
+    for index, direction in enumerate(moves):
+        assert frames.at(index) == position
+        position.move(direction)
+
+
+def test_truncated_and_foreign_blobs():
+    blob = record_game(3, 10, 1)[1].pack()
+    with pytest.raises(ValueError):
+        replay.unpack(blob[:-1])
+    with pytest.raises(ValueError):
+        replay.unpack(bytes([replay.FORMAT_VERSION + 1]) + blob[1:])
+
+
+def test_large_boards_are_not_recorded():
+    with pytest.raises(ValueError):
+        replay.Recording(Puzzle(17))
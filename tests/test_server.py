@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize('seconds', [float('inf'), float('nan'), 0, -1])
+def test_check_score_rejects_bad_time(seconds):
+    with pytest.raises(ValueError):
+        server.check_score('p', 4, 4, seconds)
+
+
+def test_check_top_clamps_limit():
+    assert server.check_top('4', '4', '-1', '0') == (4, 4, 1, 0)
+    assert server.check_top(4, 4, 10 ** 9, 3) == (4, 4, server.TOP_MAX, 3)
+    for rows, level in ((1, 0), (65, 0), (4, -1), (4, 4)):
+        with pytest.raises(ValueError):
+            server.check_top(rows, 4, 10, level)
+
+
+def test_top_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'TOP_CACHE', 3)
+
+    async def run():
+        store = server.Store(str(tmp_path / 'server.db'))
+        await asyncio.get_running_loop().run_in_executor(store.executor, store._connect)
+        for limit in range(1, 6):
+            await store.top(4, 4, limit, 0)
+        await store.top(4, 4, 3, 0)
+        await store.top(4, 4, 6, 0)
+        return list(store.tops)
+
+    assert asyncio.run(run()) == [(4, 4, 5, 0), (4, 4, 3, 0), (4, 4, 6, 0)]
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import difficulty
+import row_solver
+import solver
+from engine import Puzzle, scramble
+
+
+def play(puzzle, moves):
+    puzzle = puzzle.copy()
+    for direction in moves:
+        assert puzzle.move(direction) is not None
+    return puzzle
+
+
+def test_solved_board_needs_no_moves():
+    assert solver.solve(Puzzle(3), databases=()) == []
+    assert solver.next_move(Puzzle(3)) is None
+
+
+def test_all_2x2_positions_are_solved_optimally():
+    table = difficulty.distance_table(2)
+    for key, depth in table.items():
+        puzzle = Puzzle(2, key)
+        moves = solver.solve(puzzle, databases=())
+        assert len(moves) == depth
+        assert play(puzzle, moves).is_solved()
+
+
+def test_3x3_solutions_are_optimal():
+    table = difficulty.distance_table(3)
+    rng = random.Random(0)
+    for _ in range(30):
+        puzzle = scramble(3, rng)
+        moves = solver.solve(puzzle, databases=())
+        assert len(moves) == table[puzzle.tiles.tobytes()]
+        assert play(puzzle, moves).is_solved()
+
+
+def test_unsolvable_position_is_rejected():
+    with pytest.raises(ValueError):
+        solver.solve(Puzzle(3, [1, 0, 2, 3, 4, 5, 6, 7, 8]), databases=())
+
+
+def test_cancelled_search():
+    puzzle = scramble(4, random.Random(0))
+    with pytest.raises(solver.Cancelled):
+        solver.solve(puzzle, cancelled=lambda: True, databases=())
+
+
+@pytest.mark.parametrize('n', [3, 4, 5, 8, 16])
+def test_row_solver_solves(n):
+    rng = random.Random(n)
+    for _ in range(5):
+        puzzle = scramble(n, rng)
+        moves = row_solver.solve(puzzle.copy())
+        assert play(puzzle, moves).is_solved()
@@ -0,0 +1,45 @@
+import random
+import sqlite3
+
+import pytest
+
+import leaderboard
+import verifier
+from engine import scramble
+from replay import Recording
+from solver import solve
+
+
+def test_verify_reads_without_changing_the_database(tmp_path):
+    path = str(tmp_path / 'leaderboard.db')
+    puzzle = scramble(3, random.Random(0))
+    recording = Recording(puzzle, 0)
+    for direction in solve(puzzle):
+        recording.append(direction)
+    con = leaderboard.connect(path)
+    leaderboard.record(con, 'p', 3, 3, 60.0, recording.pack())
+    con.close()
+    with open(path, 'rb') as file:
+        before = file.read()
+
+    total, flagged, _ = verifier.verify(path, workers=1)
+
+    assert (total, flagged) == (1, [])
+    with open(path, 'rb') as file:
+        assert file.read() == before
+
+
+def test_verify_refuses_old_schema(tmp_path):
+    path = str(tmp_path / 'leaderboard.db')
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE leaders (name STRING, field_size STRING, time)')
+    con.commit()
+    con.close()
+
+    with pytest.raises(ValueError):
+        verifier.verify(path, workers=1)
+
+    con = sqlite3.connect(path)
+    assert con.execute('PRAGMA user_version').fetchone()[0] == 0
+    assert con.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    con.close()
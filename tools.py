@@ -1,5 +1,7 @@
 import os
-import sqlite3
+
+import leaderboard
+import online
 from PyQt5 import QtGui
 from PyQt5.QtWidgets import QGraphicsDropShadowEffect
 
@@ -14,18 +16,18 @@ NORMAL_BTN_ID = 6
 HARD_BTN_ID = 7
 LEADER_BOARD_BTN_ID = 8
 DARK_MODE_BTN_ID = 9
+STATS_BTN_ID = 10
 VERSION = 'V 1.1 By Igorase & Mihendy'
 
 COOL_FONT = QtGui.QFont("Clickuper", SIZE // 250 + SIZE // 50, QtGui.QFont.Bold, False)
 
 
-def win_check(matrix):
-    """Проверка позиции кирпичиков на соответствие выйгрышной позиции"""
-    for i in range(len(matrix)):
-        for j in range(len(matrix[i])):
-            if (i, j) != matrix[i][j]:
-                return False
-    return True
+def format_time(seconds):
+    """Время сборки в читабельном виде: '1 мин. 5.250 сек. '"""
+    parts = [(int(seconds // 3600), 'ч.'),
+             (int(seconds // 60 % 60), 'мин.'),
+             ("%.3f" % (seconds % 60), 'сек.')]
+    return ''.join(f'{value} {unit} ' for value, unit in parts if value)
 
 
 def show(widgets):
@@ -53,21 +55,12 @@ def make_game_files(obj, directory_name='data'):
     except FileExistsError:
         pass
     finally:
-        obj.con = sqlite3.connect(f"{directory_name}/leaderboard.db")
-        cur = obj.con.cursor()
-        try:
-            cur.execute('''CREATE TABLE leaders (
-                    id         INTEGER PRIMARY KEY ASC AUTOINCREMENT
-                               NOT NULL,
-                    name       STRING,
-                    field_size STRING  NOT NULL,
-                    time               NOT NULL);''')
-            obj.con.commit()
-        except sqlite3.OperationalError:
-            pass
-        except sqlite3.DatabaseError:
-            pass
-    obj.cur = obj.con.cursor()
+        # Таблица создаётся или приводится к текущей схеме, соединение
+        # держится открытым до выхода, а запись идёт в фоне (см. leaderboard.py)
+        obj.leaderboard = leaderboard.LeaderboardService(f"{directory_name}/leaderboard.db")
+        # Общий сервер необязателен: без адреса результаты остаются только здесь
+        obj.uploader = (online.ScoreUploader(online.SERVER_URL, f"{directory_name}/outbox.db")
+                        if online.SERVER_URL else None)
 
 
 def shadowEffect(widget, color: QtGui.QColor):
@@ -0,0 +1,194 @@
+"""Проверка результатов таблицы лидеров по записям партий (см. replay.py):
+каждая партия заново проигрывается с начальной позиции, и результат,
+который не мог получиться, попадает в отчёт.
+
+python verifier.py [--database data/leaderboard.db] [--workers 8] [--strict]
+python verifier.py --bench 200000     (замер на временной базе)"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from random import Random
+
+import leaderboard
+from engine import OPPOSITE, Puzzle, is_solvable, targets
+from replay import Recording, unpack
+
+# Быстрее не нажать даже с автоповтором клавиши
+MAX_MOVES_PER_SECOND = 30
+# Партий в одном задании для процесса
+CHUNK = 2000
+# Записи партий появились в схеме версии 4 (см. leaderboard._migrate_v4)
+REPLAYS_VERSION = 4
+NO_REPLAY = 'нет записи партии'
+
+_QUERY = '''
+    SELECT leaders.id, leaders.name, leaders.rows, leaders.cols, leaders.time,
+           replays.name, replays.rows, replays.cols, replays.time, replays.replay
+    FROM leaders LEFT JOIN replays ON replays.id = leaders.replay_id'''
+
+
+def simulate(n, tiles, moves):
+    """Проигрывание ходов на копии позиции. True, если все ходы возможны
+    и поле в конце собрано"""
+    table = targets(n)
+    size = n * n
+    board = bytearray(tiles)
+    blank = board.index(size - 1)
+    for direction in moves:
+        index = table[blank][direction]
+        if index < 0:
+            return False
+        board[blank] = board[index]
+        blank = index
+    board[blank] = size - 1
+    return board == bytearray(range(size))
+
+
+def check(row):
+    """Причина, по которой результат невозможен, или None"""
+    _, name, rows, cols, seconds, replay_name, replay_rows, replay_cols, replay_time, blob = row
+    if blob is None:
+        return NO_REPLAY
+    if (name, rows, cols, seconds) != (replay_name, replay_rows, replay_cols, replay_time):
+        return 'результат не совпадает с записью партии'
+    try:
+        puzzle, _, moves = unpack(blob)
+    except ValueError:
+        return 'запись партии повреждена'
+    if puzzle.n != rows or rows != cols:
+        return 'размер поля не совпадает с записью'
+    if not is_solvable(puzzle.tiles, puzzle.n):
+        return 'начальная позиция нерешаема'
+    if not simulate(puzzle.n, puzzle.tiles, moves):
+        return 'ходы не собирают поле'
+    if len(moves) > seconds * MAX_MOVES_PER_SECOND:
+        return f'{len(moves)} ходов за {seconds:.3f} с - слишком быстро'
+    return None
+
+
+def check_chunk(rows):
+    """Задание процесса: (число проверенных, [(id, name, размер, причина)])"""
+    flagged = []
+    for row in rows:
+        reason = check(row)
+        if reason is not None:
+            flagged.append((row[0], row[1], leaderboard.format_size(row[2], row[3]), reason))
+    return len(rows), flagged
+
+
+def verify(path, workers=None):
+    """Проверка всех результатов базы. Из базы читается не больше, чем
+    нужно, чтобы занять все процессы, поэтому память не растёт с её размером.
+    База открывается только для чтения: старую схему проверка не мигрирует,
+    а отказывается от неё (ValueError)"""
+    con = leaderboard.connect_read_only(path)
+    version = con.execute('PRAGMA user_version').fetchone()[0]
+    if version < REPLAYS_VERSION:
+        con.close()
+        raise ValueError(f'{path}: schema version {version} has no replays, '
+                         'open the database in the game once to upgrade it')
+    cursor = con.execute(_QUERY)
+    workers = workers or os.cpu_count()
+    total = 0
+    flagged = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < workers * 2:
+                chunk = cursor.fetchmany(CHUNK)
+                if not chunk:
+                    break
+                pending.append(pool.submit(check_chunk, chunk))
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                count, bad = future.result()
+                total += count
+                flagged.extend(bad)
+    con.close()
+    return total, flagged, time.perf_counter() - started
+
+
+def report(total, flagged, seconds, strict=False):
+    """Печать итогов. Возвращает код выхода"""
+    reasons = Counter(reason for *_, reason in flagged)
+    print(f'Проверено {total:,} результатов за {seconds:.1f} с '
+          f'({total / max(seconds, 1e-9) * 60:,.0f} в минуту)')
+    for reason, count in reasons.most_common():
+        print(f'  {reason}: {count:,}')
+    for id_, name, size, reason in flagged[:50]:
+        if reason != NO_REPLAY:
+            print(f'  #{id_} {name} ({size}): {reason}')
+    impossible = sum(count for reason, count in reasons.items() if strict or reason != NO_REPLAY)
+    return 1 if impossible else 0
+
+
+def _synthetic_games(n, count, length=200, seed=0):
+    """Честные партии для замера: случайное блуждание от собранного поля
+    и обратный путь как ходы игрока"""
+    rng = Random(seed)
+    puzzle = Puzzle(n)
+    walk = []
+    while len(walk) < length:
+        direction = rng.randrange(4)
+        if walk and direction == OPPOSITE[walk[-1]]:
+            continue
+        if puzzle.move(direction) is not None:
+            walk.append(direction)
+    recording = Recording(puzzle, seed)
+    for direction in reversed(walk):
+        recording.append(OPPOSITE[direction])
+    blob = recording.pack()
+    return [(f'bench{seed}_{index}', n, n, 60.0 + index % 1000, recording.count, blob)
+            for index in range(count)]
+
+
+def bench(count, workers=None):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'leaderboard.db')
+        con = leaderboard.connect(path)
+        with con:
+            for seed in range(10):
+                games = _synthetic_games(4, count // 10, seed=seed)
+                con.executemany('INSERT INTO replays (name, rows, cols, time, moves, replay) '
+                                'VALUES (?, ?, ?, ?, ?, ?)', games)
+            con.execute('INSERT INTO leaders (name, rows, cols, time, replay_id) '
+                        'SELECT name, rows, cols, time, id FROM replays')
+            # пара подделок: чужое время и слишком быстрая партия
+            con.execute('UPDATE leaders SET time = time / 2 WHERE id = 1')
+            con.execute('UPDATE leaders SET time = 1 WHERE id = 2')
+            con.execute('UPDATE replays SET time = 1 WHERE id = 2')
+        con.close()
+        return report(*verify(path, workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка таблицы лидеров по записям партий')
+    parser.add_argument('--database', default='data/leaderboard.db')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--strict', action='store_true',
+                        help='считать ошибкой и результаты без записи партии')
+    parser.add_argument('--bench', type=int, metavar='GAMES',
+                        help='замер на временной базе из GAMES честных партий 4 x 4')
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.bench, args.workers)
+        return
+    if not os.path.exists(args.database):
+        parser.error(f'no database: {args.database}')
+    try:
+        result = verify(args.database, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    sys.exit(report(*result, strict=args.strict))
+
+
+if __name__ == '__main__':
+    main()